@@ -6,6 +6,7 @@ natural language semantics in the style of Heim & Kratzer (1998)."""
 
 from string import ascii_uppercase
 import ast
+import sys
 from IPython import get_ipython
 
 from .semantics.interpret import Interpreter, defined, rule
@@ -13,6 +14,7 @@ from .syntax.tree import Tree
 from .core.phivalue import PhiValue
 from .core.stypes import *
 from .core.constants import UNDEF, VACUOUS
+from .core.domain import Domain, DomainSet, individual_key
 
 # Install the backtick DSL for PhiValue literals
 from .dsl import backtick
@@ -22,7 +24,13 @@ from .dsl.backtick import *
 #from .core.display import inject_css
 #inject_css()
 
-DOMAIN = [PhiValue(repr(c), stype=Type.e) for c in ascii_uppercase]
+DOMAIN = Domain(PhiValue(repr(c), stype=Type.e) for c in ascii_uppercase)
+
+def _as_domain(domain):
+  # DOMAIN itself may have been rebound to a plain list by the user
+  if domain is None:
+    domain = DOMAIN
+  return domain if isinstance(domain, Domain) else Domain(domain)
 
 class Predicate(set):
   """A set of tuples representing a predicate."""
@@ -39,12 +47,78 @@ class Predicate(set):
       item = (item,)
     return tuple(cls._canon_individual(x) for x in item)
 
+  @staticmethod
+  def _individual_key(item):
+    # Identity of an individual for membership tests: the literal value for
+    # constant PhiValues, the bare name for symbolic ones (B ~ 'B'), and the
+    # object itself otherwise.  A computed PhiValue such as chr(66) is
+    # identified by its value, as in Domain.id_of; one whose value cannot
+    # serve as a key stands for itself (compared by interned term id).
+    key = individual_key(item)
+    if key is item and isinstance(item, PhiValue):
+      try:
+        value = item.eval()
+        hash(value)
+      except Exception:
+        return key
+      return individual_key(value)
+    return key
+
+  @classmethod
+  def _key_tuple(cls, item):
+    if not isinstance(item, tuple):
+      item = (item,)
+    return tuple(cls._individual_key(x) for x in item)
+
+  def _index(self):
+    # (domain, size, members, keys): the unary members that are individuals
+    # of DOMAIN as a DomainSet over its ids, and the key tuples of all other
+    # members.  Built on first use; dropped whenever the set is modified
+    # (see the mutators below) and rebuilt if DOMAIN is rebound or grows.
+    domain = DOMAIN if isinstance(DOMAIN, Domain) else None
+    size = None if domain is None else len(domain)
+    index = self.__dict__.get("_key_index")
+    if index is None or index[0] is not domain or index[1] != size:
+      ids, keys = [], set()
+      for tup in set.__iter__(self):
+        i = None
+        if domain is not None:
+          if not isinstance(tup, tuple):
+            i = domain.id_of(tup)
+          elif len(tup) == 1:
+            i = domain.id_of(tup[0])
+        if i is None:
+          keys.add(self._key_tuple(tup))
+        else:
+          ids.append(i)
+      members = None if domain is None else DomainSet._from_ids(domain, ids)
+      index = self._key_index = (domain, size, members, frozenset(keys))
+    return index
+
   def __contains__(self, item):
-    # Use == (which honours PhiValue.__eq__) instead of hash-based set lookup,
-    # so that e.g. the string 'B' and PhiValue('B') are treated as the same individual.
+    # Compare individuals by id or key rather than by == so that e.g. the
+    # string 'B' and PhiValue('B') are treated as the same individual without
+    # evaluating or re-serialising either side.
     # Also normalise bare individuals to 1-tuples so `'B' in BLACK` works like `('B',) in BLACK`.
-    item = self._canon_tuple(item)
-    return any(item == self._canon_tuple(tup) for tup in set.__iter__(self))
+    domain, _, members, keys = self._index()
+    if domain is not None:
+      x = item[0] if isinstance(item, tuple) and len(item) == 1 else item
+      if not isinstance(x, tuple):
+        i = domain.id_of(x)
+        if i is not None:
+          return (members.bits >> i) & 1 == 1
+    try:
+      return self._key_tuple(item) in keys
+    except TypeError:               # unhashable
+      return False
+
+  def charset(self, domain = None):
+    """The individuals of *domain* (default DOMAIN) in this predicate."""
+    if domain is None or domain is DOMAIN:
+      members = self._index()[2]
+      if members is not None:
+        return members.copy()
+    return _as_domain(domain).where(self)
 
   def __call__(self, *args):
     args = self._canon_tuple(args)
@@ -57,15 +131,39 @@ class Predicate(set):
   def __repr__(self):
     return '<Predicate: %s>' % super().__repr__()
 
+def _invalidating(method):
+  def wrapper(self, *args):
+    self.__dict__.pop("_key_index", None)
+    return method(self, *args)
+  wrapper.__name__ = method.__name__
+  return wrapper
+
+for _name in ("add", "discard", "remove", "pop", "clear", "update",
+              "intersection_update", "difference_update",
+              "symmetric_difference_update",
+              "__ior__", "__iand__", "__isub__", "__ixor__"):
+  setattr(Predicate, _name, _invalidating(getattr(set, _name)))
+del _name
+
 
 def charset(f, domain = None):
-  if domain is None:
-    domain = DOMAIN
-  return {c for c in domain if f(c)}
+  """The individuals of *domain* (default DOMAIN) for which *f* holds.
+
+  Returns a DomainSet: a set whose members must be individuals of the
+  domain.
+  """
+  if isinstance(f, DomainSet):
+    return f.copy()
+  if isinstance(f, Predicate):
+    return f.charset(domain)
+  return _as_domain(domain).where(f)
 
 def singular(f, domain = None):
-  if domain is None:
-    domain = DOMAIN
+  if isinstance(f, Predicate):
+    f = f.charset(domain)
+  if isinstance(f, DomainSet):
+    return len(f) == 1
+  domain = _as_domain(domain)
   stype = getattr(f, 'stype', None)
   if stype is not None:
     match stype:
@@ -126,15 +224,19 @@ def singular(f, domain = None):
         f"for {x!r}: {y!r} ({type(y).__name__})"
       ) from exc
 
-  return sum(truth_at(x) for x in domain) == 1
+  return len(domain.where(truth_at)) == 1
 
 def empty(f, domain = None):
-  if domain is None:
-    domain = DOMAIN
-  return not any(f(x) for x in domain)
+  if isinstance(f, Predicate):
+    f = f.charset(domain)
+  if isinstance(f, DomainSet):
+    return not f
+  return not any(f(x) for x in _as_domain(domain))
 
 def iota(f, domain = None):
-  return tuple(charset(f,domain))[0]
+  for x in charset(f, domain):
+    return x
+  raise IndexError("iota() of an empty set")
 
 def single(s):
   return len(s)==1
@@ -143,8 +245,9 @@ def single(s):
 #  return len(s)==0
 
 
-# Splash screen
-print(r"""
+# Splash screen (only for interactive sessions, so piped output stays clean)
+if get_ipython() is not None or sys.stdout.isatty():
+  print(r"""
              _    _                  _    _
             | |  | |                | |  | |
            _| |_ | |__   ___  ___  _| |_ | |__   ___  _ __ _   _  ____
@@ -0,0 +1,144 @@
+"""
+phosphorus.cli
+--------------
+``p4s`` console entry point: interpret bracketed trees, write JSONL.
+
+  p4s -g my_grammar.py trees.txt > results.jsonl
+  cat treebank.txt | p4s -g mypkg.grammar:interp -j 8
+
+The grammar is a Python file or importable module that defines an
+``Interpreter`` (by default under the name ``interp``; choose another with
+``file.py:name``).  The name may also be bound to a zero-argument
+function returning one.
+
+Trees are read lazily; a tree may span several lines, and blank lines and
+``#`` comment lines between trees are ignored.  Each tree produces one
+JSON object per output line (the fields of
+:class:`p4s.semantics.batch.Interpretation`), so arbitrarily large tree
+banks run in constant memory.
+"""
+
+from __future__ import annotations
+
+import argparse
+import importlib
+import json
+import os
+import re
+import runpy
+import sys
+from dataclasses import asdict
+from typing import Iterable, Iterator
+
+from p4s.semantics.interpret import Interpreter
+from p4s.semantics.batch import interpret_many
+
+__all__ = ["main", "read_trees", "load_interpreter"]
+
+_PAREN = re.compile(r"[()]")
+
+
+def read_trees(lines: Iterable[str]) -> Iterator[str]:
+  """Split a stream of lines into bracketed tree strings.
+
+  A non-empty line outside any tree that does not start with ``(`` is
+  passed through as a bare token.
+  """
+  parts: list[str] = []
+  depth = 0
+  for line in lines:
+    if depth == 0:
+      text = line.strip()
+      if not text or text.startswith("#"):
+        continue
+      if not text.startswith("("):
+        yield text
+        continue
+    start = 0 if depth else line.index("(")
+    for m in _PAREN.finditer(line, start):
+      if m.group() == "(":
+        if depth == 0:
+          start = m.start()
+        depth += 1
+      elif depth:
+        depth -= 1
+        if depth == 0:
+          parts.append(line[start:m.end()])
+          yield " ".join(p.strip() for p in parts)
+          parts = []
+    if depth:
+      parts.append(line[start:])
+  if parts:
+    # unbalanced tail: pass it on so it is reported as a parse error
+    yield " ".join(p.strip() for p in parts)
+
+
+def load_interpreter(spec: str) -> Interpreter:
+  """Load the ``Interpreter`` named by *spec* (``file.py[:name]`` or
+  ``package.module[:name]``)."""
+  target, attr = spec, "interp"
+  head, sep, tail = spec.rpartition(":")
+  if sep and tail.isidentifier():
+    target, attr = head, tail
+
+  if target.endswith(".py") or os.path.exists(target):
+    namespace = runpy.run_path(target)
+  else:
+    namespace = vars(importlib.import_module(target))
+  if attr not in namespace:
+    raise SystemExit(f"p4s: {target} defines no {attr!r}")
+
+  interp = namespace[attr]
+  if not isinstance(interp, Interpreter) and callable(interp):
+    interp = interp()
+  if not isinstance(interp, Interpreter):
+    raise SystemExit(f"p4s: {spec} is not an Interpreter")
+  return interp
+
+
+def _parser() -> argparse.ArgumentParser:
+  parser = argparse.ArgumentParser(
+    prog="p4s",
+    description="Interpret bracketed trees and write one JSON result per line.")
+  parser.add_argument("input", nargs="?", default="-",
+                      help="file of bracketed trees (default: stdin)")
+  parser.add_argument("-g", "--grammar", required=True,
+                      help="grammar defining an Interpreter: file.py[:name] "
+                           "or package.module[:name] (name defaults to 'interp')")
+  parser.add_argument("-j", "--workers", type=int, default=1,
+                      help="worker processes (default: 1, in-process)")
+  parser.add_argument("--chunksize", type=int, default=32,
+                      help="trees sent to a worker at a time (default: 32)")
+  parser.add_argument("--unordered", action="store_true",
+                      help="write results as they complete, not in input order")
+  return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+  args = _parser().parse_args(argv)
+  interp = load_interpreter(args.grammar)
+
+  stream = sys.stdin if args.input == "-" else open(args.input, encoding="utf-8")
+  try:
+    results = interpret_many(interp, read_trees(stream),
+                             workers=args.workers,
+                             chunksize=args.chunksize,
+                             ordered=not args.unordered)
+    out = sys.stdout
+    for record in results:
+      out.write(json.dumps(asdict(record), ensure_ascii=False) + "\n")
+    out.flush()
+  except BrokenPipeError:
+    # downstream closed early (e.g. `| head`): point stdout at devnull so
+    # the flush at interpreter exit does not fail again
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    os.dup2(devnull, sys.stdout.fileno())
+    return 1
+  finally:
+    if stream is not sys.stdin:
+      stream.close()
+  return 0
+
+
+if __name__ == "__main__":
+  sys.exit(main())
@@ -0,0 +1,118 @@
+"""phosphorus.core.cache
+---------------------------------
+Small bounded LRU cache with hit/miss accounting.
+
+Used wherever the engine memoises work keyed by a structural fingerprint
+(compiled code objects, normal forms, denotations).  Unlike
+``functools.lru_cache`` the size limit can be changed at run time and
+the cache can be inspected or cleared from a notebook.
+"""
+
+from __future__ import annotations
+
+from collections import OrderedDict
+from typing import Any, Hashable, NamedTuple
+
+
+class CacheInfo(NamedTuple):
+  """Snapshot of cache statistics (mirrors ``functools`` naming)."""
+  hits: int
+  misses: int
+  maxsize: int | None
+  currsize: int
+
+
+class LRUCache:
+  """Bounded mapping that evicts the least recently used entry.
+
+  ``maxsize=None`` means unbounded; ``maxsize=0`` disables caching.
+  """
+
+  __slots__ = ("_data", "maxsize", "hits", "misses")
+
+  def __init__(self, maxsize: int | None = 1024) -> None:
+    self._data: OrderedDict[Hashable, Any] = OrderedDict()
+    self.maxsize = maxsize
+    self.hits = 0
+    self.misses = 0
+
+  # ------------------------------------------------------------------
+  #  lookup / insert
+  # ------------------------------------------------------------------
+
+  def get(self, key: Hashable, default: Any = None) -> Any:
+    """Return the cached value for *key* (marking it recently used)."""
+    try:
+      value = self._data[key]
+    except KeyError:
+      self.misses += 1
+      return default
+    self._data.move_to_end(key)
+    self.hits += 1
+    return value
+
+  def peek(self, key: Hashable, default: Any = None) -> Any:
+    """Like :meth:`get` but leaves the hit/miss statistics alone.
+
+    Useful when one logical lookup probes several candidate keys.
+    """
+    try:
+      value = self._data[key]
+    except KeyError:
+      return default
+    self._data.move_to_end(key)
+    return value
+
+  def put(self, key: Hashable, value: Any) -> None:
+    """Insert *value* under *key*, evicting old entries if needed."""
+    if self.maxsize == 0:
+      return
+    self._data[key] = value
+    self._data.move_to_end(key)
+    self._evict()
+
+  def pop(self, key: Hashable, default: Any = None) -> Any:
+    return self._data.pop(key, default)
+
+  def keys(self) -> list[Hashable]:
+    """Snapshot of the keys, least recently used first."""
+    return list(self._data)
+
+  # ------------------------------------------------------------------
+  #  management
+  # ------------------------------------------------------------------
+
+  def info(self) -> CacheInfo:
+    return CacheInfo(self.hits, self.misses, self.maxsize, len(self._data))
+
+  def resize(self, maxsize: int | None) -> None:
+    """Change the size limit, evicting entries that no longer fit."""
+    self.maxsize = maxsize
+    self._evict()
+
+  def clear(self) -> None:
+    """Drop all entries and reset the statistics."""
+    self._data.clear()
+    self.hits = 0
+    self.misses = 0
+
+  def _evict(self) -> None:
+    if self.maxsize is None:
+      return
+    while len(self._data) > self.maxsize:
+      self._data.popitem(last=False)
+
+  # ------------------------------------------------------------------
+  #  container protocol
+  # ------------------------------------------------------------------
+
+  def __contains__(self, key: Hashable) -> bool:
+    return key in self._data
+
+  def __len__(self) -> int:
+    return len(self._data)
+
+  def __repr__(self) -> str:
+    hits, misses, maxsize, currsize = self.info()
+    return (f"<LRUCache hits={hits} misses={misses} "
+            f"maxsize={maxsize} currsize={currsize}>")
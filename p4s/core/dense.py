@@ -0,0 +1,250 @@
+"""phosphorus.core.dense
+---------------------
+Dense NumPy backend for relations over a fixed, indexed domain.
+
+A :class:`DenseRelation` stores a *k*‑ary relation over a domain of *n*
+individuals as a boolean array of shape ``(n,) * k``.  It offers the same
+interface as the tuple‑set :class:`~p4s.core.logic.Relation` (calling,
+prefix lookup with ``R[a]``, iteration, ``|``, ``&``, ``-``, ``^`` and
+``charset``) and converts to and from it, plus operations that are whole
+array operations here:
+
+  >>> R.converse()            # transpose
+  >>> R.compose(S)            # {(x, z) | R(x, y) and S(y, z)}: matrix product
+  >>> R.exists()              # {x | R(x, y) for some y}:  any‑reduction
+  >>> R.forall()              # {x | R(x, y) for all y}:   all‑reduction
+  >>> R.counts()              # number of y with R(x, y), for each x
+
+A binary relation over 10^4 individuals takes 100 MB.  Composing two is
+a BLAS matrix product, computed in blocks of rows and columns so that its
+working memory beyond the 100 MB result stays near
+``DenseRelation.COMPOSE_BLOCK_BYTES`` (64 MB per operand block).  Requires
+NumPy (``pip install p4s[dense]``).
+"""
+
+from __future__ import annotations
+
+from typing import Iterable, Iterator
+
+import numpy as np
+
+from p4s.core.logic import Relation, _tuplify
+
+__all__ = ["DenseRelation"]
+
+
+class DenseRelation:
+  """Boolean‑valued *k*‑ary relation stored as a NumPy boolean array."""
+
+  __slots__ = ("domain", "_ids", "mask")
+
+  # size of the float32 row / column blocks compose() multiplies
+  COMPOSE_BLOCK_BYTES = 1 << 26
+
+  def __init__(self, mask: np.ndarray, domain: Iterable, _ids: dict | None = None):
+    self.domain = tuple(domain)
+    self._ids = _ids if _ids is not None else {x: i for i, x in enumerate(self.domain)}
+    self.mask = np.asarray(mask, dtype=bool)
+    if any(n != len(self.domain) for n in self.mask.shape):
+      raise ValueError(f"mask shape {self.mask.shape} does not match a domain "
+                       f"of {len(self.domain)} individuals")
+
+  # construction ─────────────────────────────────────────────
+  @classmethod
+  def from_tuples(cls, extension: Iterable, domain: Iterable,
+                  arity: int | None = None) -> "DenseRelation":
+    """Relation over *domain* holding the tuples of *extension*."""
+    domain = tuple(domain)
+    ids = {x: i for i, x in enumerate(domain)}
+    try:
+      coords = [[ids[x] for x in _tuplify(t)] for t in extension]
+    except KeyError as exc:
+      raise ValueError(f"{exc.args[0]!r} is not in the domain") from None
+    sizes = {len(c) for c in coords}
+    if arity is None:
+      if not sizes:
+        raise ValueError("Extension cannot be empty – arity undefined.")
+      arity = next(iter(sizes))
+    if sizes - {arity}:
+      raise ValueError(f"Mixed‑arity tuples: {sizes | {arity}}")
+    mask = np.zeros((len(domain),) * arity, dtype=bool)
+    if coords:
+      mask[tuple(np.array(coords, dtype=np.intp).T)] = True
+    return cls(mask, domain, ids)
+
+  @classmethod
+  def from_relation(cls, rel: Relation, domain: Iterable) -> "DenseRelation":
+    return cls.from_tuples(rel, domain, rel.arity)
+
+  def to_relation(self) -> Relation:
+    """The equivalent tuple‑set :class:`Relation`."""
+    return Relation(self)
+
+  def _like(self, mask: np.ndarray) -> "DenseRelation":
+    return DenseRelation(mask, self.domain, self._ids)
+
+  def _mask_of(self, other) -> np.ndarray:
+    if isinstance(other, DenseRelation) and other.domain == self.domain:
+      mask = other.mask
+    else:
+      mask = DenseRelation.from_tuples(other, self.domain, self.arity).mask
+    if mask.ndim != self.arity:
+      raise ValueError(f"Mixed‑arity tuples: {({self.arity, mask.ndim})}")
+    return mask
+
+  @property
+  def arity(self) -> int:
+    return self.mask.ndim
+
+  # call behaviour ------------------------------------------
+  def __call__(self, *args):
+    if len(args) != self.arity:
+      raise TypeError(f"Expected {self.arity} args, got {len(args)}")
+    try:
+      return int(self.mask[tuple(self._ids[a] for a in args)])
+    except (KeyError, TypeError):   # not an individual of the domain
+      return 0
+
+  # dictionary‑like access ----------------------------------
+  def __getitem__(self, key):
+    """Fix the first *m* arguments, as :meth:`Relation.__getitem__`."""
+    prefix = _tuplify(key)
+    if len(prefix) >= self.arity:
+      raise KeyError("Prefix length must be < relation arity")
+    try:
+      rest = self.mask[tuple(self._ids[a] for a in prefix)]
+    except (KeyError, TypeError):
+      raise KeyError(f"0 matches for prefix {prefix}") from None
+    hits = np.flatnonzero(rest)
+    if len(hits) != 1:
+      raise KeyError(f"{len(hits)} matches for prefix {prefix}")
+    suffix = tuple(self.domain[i] for i in np.unravel_index(hits[0], rest.shape))
+    return suffix[0] if len(suffix) == 1 else suffix
+
+  # iteration & size ----------------------------------------
+  def __iter__(self) -> Iterator[tuple]:
+    domain = self.domain
+    for coords in np.argwhere(self.mask).tolist():
+      yield tuple(domain[i] for i in coords)
+
+  def __len__(self) -> int:
+    return int(np.count_nonzero(self.mask))
+
+  def __eq__(self, other) -> bool:
+    if isinstance(other, DenseRelation):
+      return other.domain == self.domain and np.array_equal(self.mask, other.mask)
+    return NotImplemented
+
+  __hash__ = None
+
+  # native set algebra --------------------------------------
+  def __or__(self, other):
+    return self._like(self.mask | self._mask_of(other))
+
+  def __and__(self, other):
+    return self._like(self.mask & self._mask_of(other))
+
+  def __sub__(self, other):
+    return self._like(self.mask & ~self._mask_of(other))
+
+  def __xor__(self, other):
+    return self._like(self.mask ^ self._mask_of(other))
+
+  __ror__  = __or__
+  __rand__ = __and__
+  __rxor__ = __xor__
+
+  def __rsub__(self, other):
+    return self._like(self._mask_of(other) & ~self.mask)
+
+  # relational operations -----------------------------------
+  def converse(self) -> "DenseRelation":
+    """The relation with argument order reversed."""
+    return self._like(self.mask.T)
+
+  def compose(self, other: "DenseRelation") -> "DenseRelation":
+    """``{(x, z) | self(x, y) and other(y, z) for some y}`` (binary only)."""
+    if self.arity != 2:
+      raise ValueError("compose() needs binary relations")
+    right = self._mask_of(other)
+    # counts stay exact in float32 up to 2^24 witnesses, and go through
+    # BLAS; the float32 copies are made a block at a time, so they stay
+    # small however large the domain is
+    n = len(self.domain)
+    step = max(1, self.COMPOSE_BLOCK_BYTES // (4 * max(n, 1)))
+    out = np.empty((n, n), dtype=bool)
+    for j in range(0, n, step):
+      cols = right[:, j:j + step].astype(np.float32)
+      for i in range(0, n, step):
+        rows = self.mask[i:i + step].astype(np.float32)
+        np.greater(rows @ cols, 0, out=out[i:i + step, j:j + step])
+    return self._like(out)
+
+  def exists(self, axis: int = -1) -> "DenseRelation":
+    """Drop argument *axis*, keeping tuples that hold for some value of it."""
+    return self._like(self.mask.any(axis=axis))
+
+  def forall(self, axis: int = -1) -> "DenseRelation":
+    """Drop argument *axis*, keeping tuples that hold for every value of it."""
+    return self._like(self.mask.all(axis=axis))
+
+  def counts(self, axis: int = -1) -> np.ndarray:
+    """Number of values of argument *axis* for which each tuple holds."""
+    return np.count_nonzero(self.mask, axis=axis)
+
+  # pretty print --------------------------------------------
+  def __repr__(self):
+    return (f"DenseRelation(arity={self.arity}, domain={len(self.domain)}, "
+            f"size={len(self)})")
+
+  # charset --------------------------------------------------
+  def charset(self):
+    """As :meth:`Relation.charset`: 0 and 1 must be individuals of the
+    domain and the last argument of every tuple."""
+    flags = [i for i, x in enumerate(self.domain)
+             if isinstance(x, int) and x in (0, 1)]
+    other = np.ones(len(self.domain), dtype=bool)
+    other[flags] = False
+    if self.mask[..., other].any():
+      raise ValueError("charset only defined when last element is 0/1")
+    true = [i for i in flags if self.domain[i] == 1]
+    if not true:
+      return set()
+    domain = self.domain
+    prefixes = np.argwhere(self.mask[..., true[0]]).tolist()
+    return {domain[p[0]] if len(p) == 1 else tuple(domain[i] for i in p)
+            for p in prefixes}
+
+
+# ────────────────── quick self‑test ─────────────────────────
+if __name__ == "__main__":
+  D = tuple("ABCD")
+  R = Relation({("A", "B"), ("B", "C"), ("C", "C")})
+  d = DenseRelation.from_relation(R, D)
+  assert set(d) == set(R) and len(d) == 3 and d("A", "B") == 1 and d("B", "A") == 0
+  assert d["A"] == "B" and set(d.to_relation()) == set(R)
+  try:
+    d["D"]
+  except KeyError as e:
+    assert "0 matches" in str(e)
+  assert set(d | {("D", "A")}) == set(R) | {("D", "A")}
+  assert set(d - {("A", "B")}) == {("B", "C"), ("C", "C")}
+  assert set(d.converse()) == {(y, x) for x, y in R}
+  assert set(d.compose(d)) == {("A", "C"), ("B", "C"), ("C", "C")}
+  assert set(d.exists()) == {("A",), ("B",), ("C",)}
+  assert list(d.counts()) == [1, 1, 1, 0]
+  assert len(d.compose(DenseRelation.from_tuples((), D, arity=2))) == 0
+  # blocked products agree with a single one
+  rng = np.random.default_rng(0)
+  big = DenseRelation(rng.random((50, 50)) < 0.05, range(50))
+  whole = big.compose(big)
+  saved = DenseRelation.COMPOSE_BLOCK_BYTES
+  DenseRelation.COMPOSE_BLOCK_BYTES = 4 * 50 * 7      # blocks of 7 rows / columns
+  try:
+    assert big.compose(big) == whole and len(whole) > 0
+  finally:
+    DenseRelation.COMPOSE_BLOCK_BYTES = saved
+  assert whole.mask.tolist() == ((big.mask.astype(int) @ big.mask) > 0).tolist()
+  f = DenseRelation.from_tuples({("A", 1), ("B", 0)}, D + (0, 1))
+  assert f.charset() == {"A"}
+  print("✅ DenseRelation sanity tests passed.")
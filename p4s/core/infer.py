@@ -2,7 +2,8 @@
 *   Annotate every visited
     *expression* node with a ``stype`` attribute.  That avoids inserting
     tuples into the AST and eliminates the unparser KeyError.
-*   The transformer strips DSL cues in‑place.
+*   The transformer strips DSL cues copy‑on‑write: the input is never
+    modified.
 *   ``infer_type`` now simply returns ``getattr(node, 'stype', None)``
     after walking.
 """
@@ -15,6 +16,7 @@ from collections import ChainMap
 from typing import Any, Mapping
 
 from .stypes import Type
+from p4s.simplify.utils import CopyOnWriteTransformer, copy_node
 
 LOG = logging.getLogger(__name__)
 
@@ -41,8 +43,32 @@ def _slice_to_spec(slice_node: ast.AST) -> tuple:
 #  main transformer (adds .stype attribute)
 # ---------------------------------------------------------------------------
 
-class _Infer(ast.NodeTransformer):
-  """Annotate nodes with .stype and .guard; strip DSL cues."""
+class _Param:
+  """Stand-in env entry for a lambda parameter; its stype may be refined."""
+
+  __slots__ = ("stype",)
+
+  def __init__(self, stype: Type):
+    self.stype = stype
+
+
+def _annotated(node: ast.AST, **annotations) -> ast.AST:
+  """*node* carrying *annotations*: itself if it already does, else a copy."""
+  if all(getattr(node, k, None) is v for k, v in annotations.items()):
+    return node
+  node = copy_node(node)
+  for k, v in annotations.items():
+    setattr(node, k, v)
+  return node
+
+
+class _Infer(CopyOnWriteTransformer):
+  """Annotate nodes with .stype and .guard; strip DSL cues.
+
+  Copy-on-write: the input tree is never modified, so ASTs shared with
+  other PhiValues (spliced in by ``apply`` or a call) stay as they were.
+  Annotated nodes are copies, and so is the path above them.
+  """
 
   def __init__(self, env: Mapping[str, Any]):
     self.env: ChainMap[str, Any] = ChainMap({}, *([env] if env else []))
@@ -53,37 +79,40 @@ class _Infer(ast.NodeTransformer):
 
   def visit_Name(self, node: ast.Name):
     val = self.env.get(node.id)
+    annotations = {}
     if hasattr(val, "stype"):
-      node.stype = val.stype
+      annotations["stype"] = val.stype
     if hasattr(val, "guard"):
-      node.guard = val.guard
-    return node
+      annotations["guard"] = val.guard
+    return _annotated(node, **annotations)
 
   def visit_Attribute(self, node: ast.Attribute):
-    t = Type.from_spec(node.attr)
+    try:
+      t = Type.from_spec(node.attr)
+    except AttributeError:        # an ordinary attribute, e.g. R.compose
+      t = None
     if t is not None:
-      node.value.stype = t
-      return self.visit(node.value)          # strip .Type attribute
-    node.value = self.visit(node.value)
-    return node
+      # strip .Type attribute
+      return self.visit(_annotated(node.value, stype=t))
+    return self.generic_visit(node)
 
   # -------------------------------------------------------------------
   #  DSL subscript [type]  or [type:guard]
   # -------------------------------------------------------------------
 
   def XXvisit_Subscript(self, node: ast.Subscript): #Turned off for now
-    node.value = self.visit(node.value)
+    value = self.visit(node.value)
     type_spec, guard = _slice_to_spec(node.slice)
 
     if type_spec is not None:
       try:
-        node.value.stype = Type.from_spec(type_spec)
+        value = _annotated(value, stype=Type.from_spec(type_spec))
       except Exception as e:
         LOG.warning("Invalid type spec %r: %s", type_spec, e)
-        return node.value
+        return value
       if guard is not None:
-        node.value.guard = guard
-      return node.value                     # strip DSL cue
+        value = _annotated(value, guard=guard)
+      return value                          # strip DSL cue
     return super().generic_visit(node)
 
   # -------------------------------------------------------------------
@@ -99,7 +128,6 @@ class _Infer(ast.NodeTransformer):
     # 1. infer parameter types from default annotations
     rev_defaults = node.args.defaults[::-1]
     param_types = []
-    param_env_objs = []  # Keep references to environment objects
     for i, arg in enumerate(node.args.args[::-1]):
       dflt = rev_defaults[i] if i < len(rev_defaults) else None
       if isinstance(dflt, ast.Attribute) and isinstance(dflt.value, ast.Name) and dflt.value.id == "Type":
@@ -109,34 +137,29 @@ class _Infer(ast.NodeTransformer):
       else:
         param_types.append(Type.fresh())
     param_types.reverse()
-    node.args.defaults = []
+    args = copy_node(node.args, defaults=[]) if node.args.defaults else node.args
 
     # 2. recurse on body with params in env
-    inner_env = {
-      p.arg: type("_T", (), {"stype": t})() for p, t in zip(node.args.args, param_types)
-    }
+    inner_env = {p.arg: _Param(t) for p, t in zip(node.args.args, param_types)}
     param_env_objs = [inner_env[p.arg] for p in node.args.args]  # Save references
     body_node = self.__class__(self.env.new_child(inner_env)).visit(node.body)
-    node.body = body_node
+    if args is not node.args or body_node is not node.body:
+      node = copy_node(node, args=args, body=body_node)
 
     # 3. function type:  param_types → body_t
     # Check if any parameter types were unified during body visit
-    unified_param_types = [getattr(obj, "stype", t) for obj, t in zip(param_env_objs, param_types)]
+    unified_param_types = [obj.stype for obj in param_env_objs]
     
     body_t = getattr(body_node, "stype", Type.fresh())
     fn_t = body_t
     for dom in reversed(unified_param_types):
       fn_t = Type((dom, fn_t))
-    node.stype = fn_t
 
     # 4. propagate guard: λx. BODY  →  guard := λx. BODY.guard
     body_guard = getattr(body_node, "guard", None)
     if body_guard is not None:
-      node.guard = ast.Lambda(
-        args=node.args, body=body_guard,
-      )
-
-    return node
+      return _annotated(node, stype=fn_t, guard=ast.Lambda(args=args, body=body_guard))
+    return _annotated(node, stype=fn_t)
 
   # -------------------------------------------------------------------
   #  calls  — compose guards
@@ -148,6 +171,7 @@ class _Infer(ast.NodeTransformer):
     explicit_stype = getattr(node, "stype", None)
     
     node = self.generic_visit(node)
+    annotations = {}
 
     # ---------- type inference (unchanged) ----------------------------
     fn_t = getattr(node.func, "stype", None)
@@ -159,21 +183,20 @@ class _Infer(ast.NodeTransformer):
       elif arg_t and arg_t.is_unknown and not dom.is_unknown:
         # Unify unknown argument type with the known domain type
         arg_t = dom
-        node.args[0].stype = dom
-        # Also update the environment if this is a Name node
+        node = copy_node(node, args=[_annotated(node.args[0], stype=dom), *node.args[1:]])
+        # Also refine the parameter's type if this is a lambda parameter
         if isinstance(node.args[0], ast.Name):
-          var_name = node.args[0].id
-          env_val = self.env.get(var_name)
-          if env_val is not None and hasattr(env_val, "stype"):
+          env_val = self.env.get(node.args[0].id)
+          if isinstance(env_val, _Param):
             env_val.stype = dom
       elif arg_t and arg_t != dom:
         LOG.warning("Type mismatch: expected %s, got %s in %s",
                     fn_t.domain, arg_t, ast.unparse(node))
       # Only set inferred type if no explicit type was provided
       if explicit_stype is None:
-        node.stype = fn_t.range
+        annotations["stype"] = fn_t.range
       else:
-        node.stype = explicit_stype
+        annotations["stype"] = explicit_stype
 
     # ---------- guard propagation ------------------------------------
     fn_guard  = getattr(node.func, "guard", None)
@@ -190,20 +213,20 @@ class _Infer(ast.NodeTransformer):
       guards.append(arg_guard)
 
     if guards:
-      node.guard = guards[0] if len(guards) == 1 else \
+      annotations["guard"] = guards[0] if len(guards) == 1 else \
         ast.BoolOp(ast.And(), guards)
 
-    return node
+    return _annotated(node, **annotations)
 
   # -------------------------------------------------------------------
   #  binary operations - propagate type from left operand of %
   # -------------------------------------------------------------------
 
   def visit_BinOp(self, node: ast.BinOp):
-    self.generic_visit(node)
+    node = self.generic_visit(node)
     match node:
       case ast.BinOp(left=left, op=ast.Mod()):
-        node.stype = getattr(left, "stype", None)
+        return _annotated(node, stype=getattr(left, "stype", None))
     return node
 
   # -------------------------------------------------------------------
@@ -212,9 +235,7 @@ class _Infer(ast.NodeTransformer):
 
   def visit_BoolOp(self, node: ast.BoolOp):
     """Handle boolean operators (And, Or)."""
-    self.generic_visit(node)
-    
-    node.stype = Type.t
+    node = _annotated(self.generic_visit(node), stype=Type.t)
     
     # Check if any operand has a known type that's not Type.t or unknown
     for value in node.values:
@@ -227,10 +248,10 @@ class _Infer(ast.NodeTransformer):
   
   def visit_UnaryOp(self, node: ast.UnaryOp):
     """Handle unary operators, specifically Not."""
-    self.generic_visit(node)
+    node = self.generic_visit(node)
     
     if isinstance(node.op, ast.Not):
-      node.stype = Type.t
+      node = _annotated(node, stype=Type.t)
       
       # Check if operand has a known type that's not Type.t or unknown
       operand_type = getattr(node.operand, "stype", None)
@@ -246,7 +267,10 @@ class _Infer(ast.NodeTransformer):
 # ---------------------------------------------------------------------------
 
 def infer_and_strip(node: ast.AST, env: Mapping[str, Any] | None = None) -> ast.AST:
-  """Annotate *node* with ``.stype`` and ``.guard``, strip DSL cues, and return the (possibly replaced) node."""
+  """Return *node* annotated with ``.stype`` and ``.guard`` and with DSL cues stripped.
+
+  *node* itself is left untouched; unchanged subtrees are shared.
+  """
   return _Infer(env or {}).visit(node)
 
 
@@ -257,6 +281,18 @@ def infer_and_strip(node: ast.AST, env: Mapping[str, Any] | None = None) -> ast.
 if __name__ == "__main__":
   import ast as _ast
 
+  # the input tree is never modified, and untouched subtrees are shared
+  def snapshot(tree):
+    return [(n, dict(vars(n)), [list(v) for v in vars(n).values() if isinstance(v, list)])
+            for n in _ast.walk(tree)]
+  arg = type("_Holder", (), {"stype": Type.fresh()})()
+  tree0 = _ast.parse("(lambda x=Type.e: FLUFFY(x).t and x.e)(a) + [1, 2][0]", mode="eval").body
+  before = snapshot(tree0)
+  node0 = infer_and_strip(tree0, {"a": arg})
+  assert snapshot(tree0) == before and node0 is not tree0
+  assert node0.right is tree0.right and arg.stype.is_unknown
+  assert getattr(node0.left, "stype", None) is Type.t
+
   src1 = "(lambda x=Type.e: FLUFFY(x).t)(A)"
   tree1 = _ast.parse(src1, mode="eval").body
   node1 = infer_and_strip(tree1)
@@ -31,20 +31,92 @@ def _tuplify_set(s: Iterable):
 
 # ────────────────── Core Relation class ──────────────────────
 
+_EMPTY_MSG = "Extension cannot be empty – arity undefined."
+
+
 class Relation:
-  """Boolean‑valued *k*‑ary relation stored as a set of tuples."""
+  """Boolean‑valued *k*‑ary relation stored as a set of tuples.
+
+  Lookups go through hash indexes built on first use: one per argument
+  position (``value → tuples``; position 0 serves ``R[a]``) and one per
+  longer prefix length (``prefix → tuples``).  A Relation never changes, so its indexes
+  stay valid; relations derived by the set operators inherit them,
+  updated for the tuples that differ, and skip re‑validation.
+
+  An extension must be non‑empty, since it fixes the arity; the results of
+  the relational operations (``select``, ``join``, ``compose``, …) may be
+  empty, as their arity is known.
+  """
 
-  __slots__ = ("_ext", "arity")
+  __slots__ = ("_ext", "arity", "_prefixes", "_positions", "_charset")
 
   # construction ─────────────────────────────────────────────
   def __init__(self, extension: Iterable):
     self._ext = _tuplify_set(extension)
     if not self._ext:
-      raise ValueError("Extension cannot be empty – arity undefined.")
+      raise ValueError(_EMPTY_MSG)
     sizes = {len(t) for t in self._ext}
     if len(sizes) != 1:
       raise ValueError(f"Mixed‑arity tuples: {sizes}")
     self.arity = sizes.pop()
+    self._prefixes = {}
+    self._positions = {}
+    self._charset = None
+
+  @classmethod
+  def _trusted(cls, ext: set, arity: int, empty_ok: bool = False):
+    """Relation over *ext*, already known to be a set of *arity*‑tuples.
+
+    The relational operations pass *empty_ok*: their arity does not depend
+    on the tuples, so an empty result is still a well‑formed relation.
+    """
+    if not ext and not empty_ok:
+      raise ValueError(_EMPTY_MSG)
+    rel = object.__new__(Relation)
+    rel._ext = ext
+    rel.arity = arity
+    rel._prefixes = {}
+    rel._positions = {}
+    rel._charset = None
+    return rel
+
+  # indexes ─────────────────────────────────────────────────
+  # An index maps each key to its only tuple, or to a list of tuples when
+  # there are several (so unique keys cost no extra allocation).
+  def _prefix_index(self, m: int) -> dict:
+    """``prefix → tuples`` over prefixes of length *m*."""
+    index = self._prefixes.get(m)
+    if index is None:
+      index = {}
+      for t in self._ext:
+        _index_add(index, t[:m], t)
+      self._prefixes[m] = index
+    return index
+
+  def _position_index(self, i: int) -> dict:
+    """``value → tuples`` for argument position *i*."""
+    index = self._positions.get(i)
+    if index is None:
+      index = {}
+      for t in self._ext:
+        _index_add(index, t[i], t)
+      self._positions[i] = index
+    return index
+
+  def _derive(self, ext: set, added=(), removed=()) -> "Relation":
+    """The relation over *ext*, which is this one plus *added* minus
+    *removed*.  It inherits copies of the indexes built so far, updated for
+    the tuples that differ; after large changes it builds its own on
+    demand instead."""
+    rel = Relation._trusted(ext, self.arity)
+    if (not (self._prefixes or self._positions)
+        or len(added) + len(removed) > len(ext) // 2):
+      return rel
+    for m, index in self._prefixes.items():
+      rel._prefixes[m] = _patched(index, added, removed, lambda t: t[:m])
+    for i, index in self._positions.items():
+      rel._positions[i] = _patched(index, added, removed, lambda t: t[i])
+    return rel
 
   # call behaviour ------------------------------------------
   def __call__(self, *args):
@@ -57,18 +129,25 @@ class Relation:
     """Fix the first *m* arguments of the relation.
 
     * ``key`` may be an individual (for unary → k‑ary with k>1) or a
-      tuple prefix `(a₁,…,a_m)` with `m < arity`.
+      tuple prefix `(a₁,…,a_m)` with `m < arity`.
     * If **exactly one** tuple in the extension begins with that prefix,
-      return its *suffix* — a single element for binary relations or a
+      return its *suffix* — a single element for binary relations or a
       tuple otherwise.  Otherwise raise :class:`KeyError`.
     """
     prefix = _tuplify(key)
     if len(prefix) >= self.arity:
       raise KeyError("Prefix length must be < relation arity")
-    matches = [t[len(prefix):] for t in self._ext if t[:len(prefix)] == prefix]
+    m = len(prefix)
+    try:
+      if m == 1:
+        matches = _bucket(self._position_index(0), prefix[0])
+      else:
+        matches = _bucket(self._prefix_index(m), prefix)
+    except TypeError:               # unhashable prefix: matches nothing
+      matches = ()
     if len(matches) != 1:
       raise KeyError(f"{len(matches)} matches for prefix {prefix}")
-    suffix = matches[0]
+    suffix = matches[0][m:]
     return suffix[0] if len(suffix) == 1 else suffix
 
   # iteration & size ----------------------------------------
@@ -79,30 +158,49 @@ class Relation:
     return len(self._ext)
 
   # internal helpers ----------------------------------------
+  def _as_relation(self, other) -> "Relation":
+    return other if isinstance(other, Relation) else Relation(other)
+
   def _ext_of(self, other):
-    return other._ext if isinstance(other, Relation) else Relation(other)._ext
+    return self._as_relation(other)._ext
 
   def _new(self, ext):
     return Relation(ext)
 
+  def _same_arity(self, other: "Relation") -> None:
+    if other.arity != self.arity:
+      raise ValueError(f"Mixed‑arity tuples: {({self.arity, other.arity})}")
+
   # native set algebra --------------------------------------
+  # Operands are valid relations, so results are too: only emptiness and
+  # (for | and ^) matching arity need checking.
   def __or__(self, other):
-    return self._new(self._ext | self._ext_of(other))
+    other = self._as_relation(other)
+    self._same_arity(other)
+    added = other._ext - self._ext
+    return self._derive(self._ext | added, added=added)
 
   def __and__(self, other):
-    return self._new(self._ext & self._ext_of(other))
+    kept = self._ext & self._ext_of(other)
+    return self._derive(kept, removed=self._ext - kept)
 
   def __sub__(self, other):
-    return self._new(self._ext - self._ext_of(other))
+    removed = self._ext & self._ext_of(other)
+    return self._derive(self._ext - removed, removed=removed)
 
   def __xor__(self, other):
-    return self._new(self._ext ^ self._ext_of(other))
+    other = self._as_relation(other)
+    self._same_arity(other)
+    added = other._ext - self._ext
+    removed = self._ext & other._ext
+    return self._derive(self._ext ^ other._ext, added=added, removed=removed)
 
   # reflected operators -------------------------------------
   __ror__  = __or__
   __rand__ = __and__
   def __rsub__(self, other):
-    return Relation(self._ext_of(other) - self._ext)
+    other = self._as_relation(other)
+    return Relation._trusted(other._ext - self._ext, other.arity)
   __rxor__ = __xor__
 
   # pretty print --------------------------------------------
@@ -110,12 +208,222 @@ class Relation:
     elems = ", ".join(map(str, sorted(self._ext)))
     return f"Relation({{{elems}}})"
 
+  # dense backend -------------------------------------------
+  def dense(self, domain: Iterable = DOMAIN):
+    """This relation as a :class:`~p4s.core.dense.DenseRelation` over
+    *domain* (requires NumPy)."""
+    from p4s.core.dense import DenseRelation
+    return DenseRelation.from_relation(self, domain)
+
   # charset --------------------------------------------------
   def charset(self):
-    if not all(isinstance(t[-1], int) and t[-1] in (0, 1) for t in self._ext):
-      raise ValueError("charset only defined when last element is 0/1")
-    prefixes = {t[:-1] for t in self._ext if t[-1] == 1}
-    return {p[0] if len(p) == 1 else p for p in prefixes}
+    if self._charset is None:
+      last = self._position_index(self.arity - 1)
+      if not all(isinstance(t[-1], int) and t[-1] in (0, 1)
+                 for key in last for t in _bucket(last, key)):
+        raise ValueError("charset only defined when last element is 0/1")
+      prefixes = {t[:-1] for t in _bucket(last, 1)}
+      self._charset = frozenset(p[0] if len(p) == 1 else p for p in prefixes)
+    return set(self._charset)
+
+  # relational algebra ---------------------------------------
+  # Joins probe the other relation's position index (a hash join), so
+  # they cost O(|self| + |result|) once that index exists.
+  def converse(self):
+    """The relation with argument order reversed."""
+    return Relation._trusted({t[::-1] for t in self._ext}, self.arity, empty_ok=True)
+
+  def project(self, *positions: int):
+    """Keep the arguments at *positions*, in that order."""
+    if not positions:
+      raise ValueError("project() needs at least one position")
+    return Relation._trusted({tuple(t[i] for i in positions) for t in self._ext},
+                             len(positions), empty_ok=True)
+
+  def select(self, where, values=None):
+    """The tuples satisfying *where*.
+
+    ``R.select(i, S)`` keeps tuples whose argument *i* is a member of *S*
+    (found through the position index); ``R.select(pred)`` keeps tuples
+    ``t`` with ``pred(*t)`` true.
+    """
+    if callable(where):
+      return Relation._trusted({t for t in self._ext if where(*t)}, self.arity, empty_ok=True)
+    index = self._position_index(where)
+    return Relation._trusted({t for v in _members(values) for t in _bucket(index, v)},
+                             self.arity, empty_ok=True)
+
+  def join(self, other, on=None):
+    """Equi‑join with *other*.
+
+    *on* lists ``(i, j)`` pairs: argument *i* of this relation must equal
+    argument *j* of *other*.  It defaults to ``[(arity - 1, 0)]`` (last
+    argument here, first there).  Result tuples are this relation's tuple
+    followed by *other*'s without its joined arguments.
+    """
+    other = self._as_relation(other)
+    pairs = [(self.arity - 1, 0)] if on is None else list(on)
+    joined = {j for _, j in pairs}
+    keep = [j for j in range(other.arity) if j not in joined]
+    if len(pairs) == 1:
+      (i, j), = pairs
+      index = other._position_index(j)
+      key_of = lambda t: t[i]
+    else:
+      index = {}
+      for u in other._ext:
+        _index_add(index, tuple(u[j] for _, j in pairs), u)
+      key_of = lambda t: tuple(t[i] for i, _ in pairs)
+    ext = {t + tuple(u[k] for k in keep)
+           for t in self._ext for u in _bucket(index, key_of(t))}
+    return Relation._trusted(ext, self.arity + len(keep), empty_ok=True)
+
+  def compose(self, other):
+    """Relational composition: ``(x…, z…)`` such that ``self(x…, y)`` and
+    ``other(y, z…)`` for some *y*."""
+    other = self._as_relation(other)
+    if self.arity + other.arity < 3:
+      raise ValueError("compose() of two unary relations is empty")
+    index = other._position_index(0)
+    ext = {t[:-1] + u[1:] for t in self._ext for u in _bucket(index, t[-1])}
+    return Relation._trusted(ext, self.arity + other.arity - 2, empty_ok=True)
+
+  def image(self, xs):
+    """Everything related to a member of *xs*: the suffixes of the tuples
+    whose first argument is in *xs* (bare individuals for a binary relation).
+    """
+    index = self._position_index(0)
+    return {u[1] if self.arity == 2 else u[1:]
+            for x in _members(xs) for u in _bucket(index, x)}
+
+
+def _patched(index: dict, added, removed, key_of) -> dict:
+  """Copy of *index* with *added* tuples indexed and *removed* ones dropped.
+
+  Only the buckets that change are copied.
+  """
+  out = dict(index)
+  changed: dict = {}
+  for t in removed:
+    key = key_of(t)
+    if key not in changed:
+      changed[key] = list(_bucket(out, key))
+    changed[key].remove(t)
+  for t in added:
+    key = key_of(t)
+    if key not in changed:
+      changed[key] = list(_bucket(out, key))
+    changed[key].append(t)
+  for key, bucket in changed.items():
+    if len(bucket) > 1:
+      out[key] = bucket
+    elif bucket:
+      out[key] = bucket[0]
+    else:
+      del out[key]
+  return out
+
+
+def _members(values) -> Iterable:
+  """*values* as a collection of individuals (a bare individual, or the
+  members of a set or a unary Relation)."""
+  if isinstance(values, Relation):
+    return {t[0] for t in values} if values.arity == 1 else set(values)
+  if isinstance(values, (str, tuple)) or not isinstance(values, Iterable):
+    return (values,)
+  return values
+
+
+def _index_add(index: dict, key, t: tuple) -> None:
+  bucket = index.get(key)
+  if bucket is None:
+    index[key] = t
+  elif type(bucket) is list:
+    bucket.append(t)
+  else:
+    index[key] = [bucket, t]
+
+
+def _bucket(index: dict, key) -> tuple | list:
+  """The tuples indexed under *key*."""
+  bucket = index.get(key)
+  if bucket is None:
+    return ()
+  return bucket if type(bucket) is list else (bucket,)
+
+# ────────────────── Characteristic functions ────────────────
+
+class CharFunc(Relation):
+  """Characteristic function of a set of *k*‑tuples over *domain*, as the
+  (*k*+1)‑ary relation ``{(x…, 1) | x… in S} ∪ {(x…, 0) | x… not in S}``.
+
+  Only *S* is stored; the 0/1 column is computed on demand, so calls,
+  ``R[x…]``, iteration, ``len`` and ``charset()`` take memory
+  proportional to *S*, not to ``|domain|**k``.  Operations that need the
+  whole extension (set algebra, joins, ``repr``) build it once.
+  """
+
+  __slots__ = ("_core", "_domain", "_members", "_full")
+
+  def __init__(self, core: set, domain: Iterable):
+    self._core = core
+    self._domain = tuple(domain)
+    self._members = frozenset(self._domain)
+    self.arity = len(next(iter(core))) + 1
+    self._prefixes = {}
+    self._positions = {}
+    self._charset = None
+    self._full = None
+
+  @property
+  def _ext(self):
+    if self._full is None:
+      self._full = set(self)
+    return self._full
+
+  def _inside(self, xs: tuple) -> bool:
+    try:
+      return all(x in self._members for x in xs)
+    except TypeError:               # unhashable
+      return False
+
+  def __call__(self, *args):
+    if len(args) != self.arity:
+      raise TypeError(f"Expected {self.arity} args, got {len(args)}")
+    *xs, flag = args
+    xs = tuple(xs)
+    return int(self._inside(xs) and flag == (1 if xs in self._core else 0))
+
+  def __contains__(self, item):
+    return isinstance(item, tuple) and len(item) == self.arity and bool(self(*item))
+
+  def __getitem__(self, key):
+    prefix = _tuplify(key)
+    if len(prefix) >= self.arity:
+      raise KeyError("Prefix length must be < relation arity")
+    # arguments left open before the 0/1 column
+    free = self.arity - 1 - len(prefix)
+    count = len(self._domain) ** free if self._inside(prefix) else 0
+    if count != 1:
+      raise KeyError(f"{count} matches for prefix {prefix}")
+    xs = prefix + self._domain[:1] * free
+    suffix = xs[len(prefix):] + (1 if xs in self._core else 0,)
+    return suffix[0] if len(suffix) == 1 else suffix
+
+  def __iter__(self):
+    core = self._core
+    for tup in itertools.product(self._domain, repeat=self.arity - 1):
+      yield tup + (1 if tup in core else 0,)
+
+  def __len__(self):
+    return len(self._domain) ** (self.arity - 1)
+
+  def charset(self):
+    if self._charset is None:
+      self._charset = frozenset(t[0] if len(t) == 1 else t for t in self._core
+                                if self._inside(t))
+    return set(self._charset)
+
 
 # alias for convenience in worksheets
 Predicate = Relation
@@ -127,6 +435,36 @@ def charset(rel: Relation):
   return rel.charset()
 
 
+def converse(rel: Relation):
+  """Module‑level wrapper around :pymeth:`Relation.converse`."""
+  return rel.converse()
+
+
+def project(rel: Relation, *positions: int):
+  """Module‑level wrapper around :pymeth:`Relation.project`."""
+  return rel.project(*positions)
+
+
+def select(rel: Relation, where, values=None):
+  """Module‑level wrapper around :pymeth:`Relation.select`."""
+  return rel.select(where, values)
+
+
+def join(rel: Relation, other, on=None):
+  """Module‑level wrapper around :pymeth:`Relation.join`."""
+  return rel.join(other, on)
+
+
+def compose(rel: Relation, other):
+  """Module‑level wrapper around :pymeth:`Relation.compose`."""
+  return rel.compose(other)
+
+
+def image(rel: Relation, xs):
+  """Module‑level wrapper around :pymeth:`Relation.image`."""
+  return rel.image(xs)
+
+
 def charfunc(s: Iterable):
   """Return the characteristic‑function relation for set *s*.
 
@@ -137,11 +475,7 @@ def charfunc(s: Iterable):
   core = _tuplify_set(s)
   if not core:
     raise ValueError("charfunc needs a non‑empty set to infer arity")
-  arity = len(next(iter(core)))
-  full = set()
-  for tup in itertools.product(DOMAIN, repeat=arity):
-    full.add(tup + (1 if tup in core else 0,))
-  return Relation(full)
+  return CharFunc(core, DOMAIN)
 
 
 def single(obj):
@@ -170,8 +504,11 @@ class Model:
     return self
 
   # relations ------------------------------------------------
-  def pred(self, name: str, extension: Iterable):
-    setattr(self, name, Relation(extension))
+  def pred(self, name: str, extension: Iterable, dense: bool = False):
+    """Define relation *name*; with ``dense=True`` store it as a NumPy
+    array over this model's DOMAIN (see :mod:`p4s.core.dense`)."""
+    rel = Relation(extension)
+    setattr(self, name, rel.dense(self.DOMAIN) if dense else rel)
     return self
 
   def func(self, name: str, true_set: Iterable):
@@ -194,8 +531,9 @@ def expose(model: 'Model', g=None):
 # ────────────────── exports ─────────────────────────────────
 __all__ = [
   "DOMAIN", "A", "B", "C", "D", "E",
-  "Relation", "Predicate",
+  "Relation", "Predicate", "CharFunc",
   "charset", "charfunc", "single", "empty", "nonempty",
+  "converse", "project", "select", "join", "compose", "image",
   "Model", "expose",
 ]
 
@@ -217,4 +555,39 @@ if __name__ == "__main__":
   else:
     raise AssertionError("charset should have raised ValueError")
 
+  # relational algebra
+  LOVE = Relation({("A", "B"), ("B", "C"), ("C", "A")})
+  MOTHER = Relation({("B", "D"), ("C", "E")})
+  assert set(compose(LOVE, MOTHER)) == {("A", "D"), ("B", "E")}
+  assert set(LOVE.converse()) == {("B", "A"), ("C", "B"), ("A", "C")}
+  assert set(LOVE.select(1, {"B", "C"})) == {("A", "B"), ("B", "C")}
+  assert set(LOVE.project(0)) == {("A",), ("B",), ("C",)}
+  assert set(LOVE.join(MOTHER)) == {("A", "B", "D"), ("B", "C", "E")}
+  assert LOVE.image({"A", "B"}) == {"B", "C"} and image(LOVE, "A") == {"B"}
+  # empty results keep their arity
+  none = Relation({("A", "B")}).compose(Relation({("C", "D")}))
+  assert len(none) == 0 and none.arity == 2 and none("A", "D") == 0
+  assert LOVE.select(0, set()).arity == 2 and not LOVE.select(lambda x, y: x == y)
+  assert not LOVE.join(MOTHER, on=[(0, 1)]) and LOVE.join(MOTHER, on=[(0, 1)]).arity == 3
+  assert set(none | {("A", "D")}) == {("A", "D")}
+
+  # |, &, - and ^ hand patched copies of the built indexes to the result;
+  # lookups through them agree with a relation indexed from scratch
+  R = Relation({(x, y, z) for x in "ABCD" for y in "AB" for z in "AB"})
+  R.select(2, "A")                  # builds the position 2 index
+  R.image("A")                      # ... position 0
+  R._prefix_index(2)
+  for D in (R | {("E", "A", "A"), ("D", "C", "A")},
+            R - {("A", "B", "A"), ("A", "A", "A"), ("B", "B", "B")},
+            R ^ {("A", "B", "A"), ("E", "E", "E")},
+            R & (set(R) - {("B", "A", "B"), ("C", "B", "A")} | {("E", "E", "E")})):
+    assert D._positions and D._prefixes
+    fresh = Relation(set(D))
+    for x in "ABCDE":
+      assert set(D.select(2, x)) == set(fresh.select(2, x))
+      for y in "ABCE":
+        assert (set(_bucket(D._prefix_index(2), (x, y)))
+                == set(_bucket(fresh._prefix_index(2), (x, y))))
+  assert (R - {("A", "A", "A"), ("A", "A", "B"), ("A", "B", "A")})["A"] == ("B", "B")
+
   print("All quick checks passed.")
@@ -8,16 +8,30 @@ All heavy work (pretty HTML, richer type inference) lives elsewhere.
 """
 
 import ast
-import copy
+import builtins
 from collections import ChainMap
-from typing import Any, Optional
+from types import MappingProxyType
+from typing import Any, Iterable, Mapping, Optional
 
 from p4s.simplify           import simplify          # local functional API
-from p4s.simplify.utils     import capture_env       # caller env snapshot
+from p4s.simplify.utils     import capture_env       # caller bindings of free names
+from p4s.simplify.utils     import CopyOnWriteTransformer, copy_node
+from p4s.simplify.utils     import free_vars, lambda_params
 from p4s.core.display       import render_phi_html   # rich HTML helper
 from p4s.core.infer         import infer_and_strip   # type checker / DSL stripper
 from p4s.core.stypes        import Type              # semantic type system
 from p4s.core.constants     import UNDEF             # sentinel for undefined values
+from p4s.core.cache         import LRUCache          # bounded memo tables
+from p4s.core.terms         import term_id           # hash-consed structural ids
+
+# Compiled code objects keyed by the structural fingerprint of the
+# expression, stored with the expression so its term id stays interned.
+# Shared by PhiValue.eval and the lambda preview helpers.
+# Inspect with ``CODE_CACHE.info()``; bound with ``CODE_CACHE.resize(n)``.
+CODE_CACHE = LRUCache(maxsize=4096)
+
+_UNDEF_NAME = str(UNDEF)
+_MISSING = object()
 
 
 class _EvaluatedLambda:
@@ -40,29 +54,15 @@ class _EvaluatedLambda:
 
 
 def _lambda_param_names(expr: ast.Lambda) -> set[str]:
-  names = {
-    a.arg for a in (
-      list(expr.args.posonlyargs)
-      + list(expr.args.args)
-      + list(expr.args.kwonlyargs)
-    )
-  }
-  if expr.args.vararg is not None:
-    names.add(expr.args.vararg.arg)
-  if expr.args.kwarg is not None:
-    names.add(expr.args.kwarg.arg)
-  return names
+  return lambda_params(expr.args)
 
 
 def _node_uses_params(node: ast.AST, params: set[str]) -> bool:
-  return any(
-    isinstance(n, ast.Name) and isinstance(n.ctx, ast.Load) and n.id in params
-    for n in ast.walk(node)
-  )
+  return not free_vars(node).isdisjoint(params)
 
 
 def _lambda_header(expr: ast.Lambda) -> str:
-  preview_lambda = ast.Lambda(args=copy.deepcopy(expr.args), body=ast.Constant(value=None))
+  preview_lambda = ast.Lambda(args=expr.args, body=ast.Constant(value=None))
   return ast.unparse(preview_lambda).rsplit(":", 1)[0]
 
 
@@ -105,8 +105,7 @@ def _simplify_preview_boolop(node: ast.BoolOp) -> ast.AST:
       return ast.Constant(value=1)
     if len(values) == 1:
       return values[0]
-    node.values = values
-    return node
+    return node if values == node.values else copy_node(node, values=values)
 
   if isinstance(node.op, ast.Or):
     if any(_truth_literal_value(value) == 1 for value in values):
@@ -116,13 +115,12 @@ def _simplify_preview_boolop(node: ast.BoolOp) -> ast.AST:
       return ast.Constant(value=0)
     if len(values) == 1:
       return values[0]
-    node.values = values
-    return node
+    return node if values == node.values else copy_node(node, values=values)
 
   return node
 
 
-class _PreviewClosedFolder(ast.NodeTransformer):
+class _PreviewClosedFolder(CopyOnWriteTransformer):
   def __init__(self, params: set[str], env: dict[str, object]):
     self.params = params
     self.env = env
@@ -146,13 +144,13 @@ class _PreviewClosedFolder(ast.NodeTransformer):
 
 def _preview_lambda_expr(expr: ast.Lambda, env: dict[str, object]) -> ast.AST:
   params = _lambda_param_names(expr)
-  payload, guards = _collect_guard_chain(copy.deepcopy(expr.body))
+  payload, guards = _collect_guard_chain(expr.body)
   payload = _PreviewClosedFolder(params, env).visit(payload)
   rebuilt = _rebuild_guard_chain(payload, guards)
-  return ast.Lambda(args=copy.deepcopy(expr.args), body=rebuilt)
+  return ast.Lambda(args=expr.args, body=rebuilt)
 
 
-class _GuardModToIfExp(ast.NodeTransformer):
+class _GuardModToIfExp(CopyOnWriteTransformer):
   def visit_BinOp(self, node: ast.BinOp):
     left_was_guard = isinstance(node.left, ast.BinOp) and isinstance(node.left.op, ast.Mod)
     node = self.generic_visit(node)
@@ -198,16 +196,50 @@ class _GuardModToIfExp(ast.NodeTransformer):
     return node
 
 
-def _eval_ast_with_guards(expr: ast.AST, env: dict[str, object]) -> Any:
-  # Keep runtime guard semantics here. simplify/guard_pass.py handles
-  # static normalization, while lambda preview reuses this evaluator so
-  # display stays aligned with actual PhiValue execution.
-  expr = copy.deepcopy(expr)
+def _compile_with_guards(expr: ast.AST, key: Any = None):
+  """Return a (cached) code object for *expr* with runtime guard lowering.
+
+  *key* is the structural fingerprint of *expr*; callers that already know
+  it may pass it in to skip recomputing it.
+  """
+  if key is None:
+    key = term_id(expr)
+  entry = CODE_CACHE.get(key)
+  if entry is not None:
+    return entry[0]
+
+  source = expr
   if any(isinstance(n, ast.BinOp) and isinstance(n.op, ast.Mod)
          for n in ast.walk(expr)):
     expr = _GuardModToIfExp().visit(expr)
     ast.fix_missing_locations(expr)
   code = compile(ast.Expression(expr), filename="<phivalue>", mode="eval")
+  CODE_CACHE.put(key, (code, source))
+  return code
+
+
+def _code_names(code) -> tuple[str, ...]:
+  """Global names *code* (including nested lambdas) may load."""
+  names: dict[str, None] = {}
+  stack = [code]
+  while stack:
+    current = stack.pop()
+    names.update(dict.fromkeys(current.co_names))
+    stack.extend(c for c in current.co_consts if hasattr(c, "co_names"))
+  return tuple(names)
+
+
+def _eval_ast_with_guards(expr: ast.AST, env: dict[str, object], key: Any = None) -> Any:
+  # Keep runtime guard semantics here. simplify/guard_pass.py handles
+  # static normalization, while lambda preview reuses this evaluator so
+  # display stays aligned with actual PhiValue execution.
+  return _eval_code(_compile_with_guards(expr, key), env)
+
+
+def _eval_code(code, env: dict[str, object]) -> Any:
+  """Run *code* from :func:`_compile_with_guards` with globals *env*."""
+  # Guard lowering and guard folding both introduce the name UNDEF
+  env.setdefault(_UNDEF_NAME, UNDEF)
   return eval(code, env)
 
 
@@ -222,11 +254,7 @@ def _lambda_has_global_false_guard(expr: ast.Lambda, env: dict[str, object]) ->
     node = node.left
 
   for guard in guards:
-    guard_uses_param = any(
-      isinstance(n, ast.Name) and isinstance(n.ctx, ast.Load) and n.id in params
-      for n in ast.walk(guard)
-    )
-    if guard_uses_param:
+    if _node_uses_params(guard, params):
       continue
     try:
       value = _eval_ast_with_guards(guard, env)
@@ -259,6 +287,41 @@ def _lambda_preview(expr: ast.Lambda, env: dict[str, object]) -> str:
     rendered = repr(value)
   return f"{header}: {rendered}"
 
+def _inherit_env(env: ChainMap, names: Iterable[str], sources: Iterable) -> ChainMap:
+  """Bind the *names* *env* cannot resolve from the envs of *sources*.
+
+  Inlining a PhiValue brings its free names into the new term; they
+  resolve in the environment that PhiValue captured, wherever it was made.
+  """
+  missing = [name for name in names if name not in env]
+  if not missing:
+    return env
+  extra = {}
+  for source in sources:
+    if isinstance(source, PhiValue):
+      for name in missing:
+        if name not in extra and name in source._env:
+          extra[name] = source._env[name]
+  if not extra:
+    return env
+  # a fallback: anything *env* itself binds later still takes precedence
+  return ChainMap(*env.maps, MappingProxyType(extra))
+
+
+def _bound_phis(env: Mapping[str, Any], names: Iterable[str]) -> list:
+  """The PhiValues *env* binds to *names*."""
+  return [value for name in names
+          if isinstance(value := env.get(name), PhiValue)]
+
+
+def _typed_expr(phi: "PhiValue") -> ast.AST:
+  """*phi*'s AST carrying *phi*'s stype, ready to splice into a new term."""
+  expr = phi.expr
+  if phi.stype is not None and getattr(expr, "stype", None) != phi.stype:
+    expr = copy_node(expr)
+    expr.stype = phi.stype
+  return expr
+
 # ---------------------------------------------------------------------------
 #  PhiValue
 # ---------------------------------------------------------------------------
@@ -266,7 +329,7 @@ def _lambda_preview(expr: ast.Lambda, env: dict[str, object]) -> str:
 class PhiValue:
   """An AST + optional semantic type and guard with Jupyter‑friendly HTML."""
 
-  __slots__ = ("expr", "stype", "guard", "_env")
+  __slots__ = ("expr", "stype", "guard", "_env", "_key", "_guard_key", "_ns")
 
   # ---------------------------------------------------------------------
   #  construction
@@ -283,9 +346,27 @@ class PhiValue:
       # Convert basic Python literals to AST constants
       expr = ast.Constant(value=expr)
 
-    # 1. capture *caller* environment (skip this frame)
-    env = capture_env(skip=1)          # ChainMap
+    # 1. capture the *caller's* bindings of the free names (skip this frame)
+    names = free_vars(expr) if guard is None else free_vars(expr) | free_vars(guard)
+    self._build(expr, capture_env(skip=1, names=names), stype, guard)
 
+  @classmethod
+  def from_ast(cls,
+               expr: ast.AST, *,
+               env: Mapping[str, Any],
+               stype: Optional[Type] = None,
+               guard: Optional[ast.AST] = None) -> "PhiValue":
+    """Build a PhiValue from *expr* with explicit *env* bindings.
+
+    Like the constructor, but nothing is looked up on the call stack.
+    """
+    phi = object.__new__(cls)
+    phi._build(expr, ChainMap(MappingProxyType(dict(env))), stype, guard)
+    return phi
+
+  def _build(self, expr: ast.AST, env: ChainMap,
+             stype: Optional[Type], guard: Optional[ast.AST]) -> None:
+    sources = _bound_phis(env, free_vars(expr))
     # 2. *Infer* type while DSL cues are still present (also strips DSL cues)
     expr = infer_and_strip(expr, env)
     inferred_type = getattr(expr, "stype", None)
@@ -295,11 +376,63 @@ class PhiValue:
     simplified = simplify(expr, env=env)
     simplified_guard = inferred_guard and simplify(guard or inferred_guard, env=env)
 
-    # 4. store
+    # 4. store; names inlined PhiValues brought in resolve in their envs
+    names = free_vars(simplified)
+    if simplified_guard is not None:
+      names = names | free_vars(simplified_guard)
     self.expr  = simplified
-    self._env  = ChainMap({}, env)     # make a shallow, isolated view
+    self._env  = _inherit_env(env, names, sources)
+    self._ns   = None
     self.stype = stype or inferred_type or getattr(simplified, "stype", None)
     self.guard = simplified_guard
+    self._set_keys()
+
+  def apply(self, *args: "PhiValue", stype: Optional[Type] = None) -> "PhiValue":
+    """The application of this function to *args*, as a new PhiValue.
+
+    The call is built from the operands' ASTs, so no source is re-parsed
+    and no names are looked up on the call stack: free names resolve in
+    the operands' environments.  The result type defaults to the range of
+    this value's (already inferred) type, and the operands' guards carry
+    over as in type inference: the function's guard applied to the
+    arguments, conjoined with the arguments' own guards.
+    """
+    args = tuple(a if isinstance(a, PhiValue) else PhiValue(a) for a in args)
+    if stype is None and self.stype is not None and self.stype.is_function:
+      stype = self.stype.range
+    arg_exprs = [_typed_expr(a) for a in args]
+    call_ast = ast.Call(func=_typed_expr(self), args=arg_exprs, keywords=[])
+    if stype is not None:
+      call_ast.stype = stype
+
+    guards = []
+    if self.guard is not None and args:
+      guards.append(ast.Call(func=self.guard, args=arg_exprs, keywords=[]))
+    guards.extend(a.guard for a in args if a.guard is not None)
+    guard = None
+    if guards:
+      guard = guards[0] if len(guards) == 1 else ast.BoolOp(op=ast.And(), values=guards)
+
+    names = free_vars(call_ast)
+    env = _inherit_env(self._env, names, args)
+    simplified = simplify(call_ast, env=env)
+
+    phi = object.__new__(PhiValue)
+    phi.expr = simplified
+    phi.stype = stype or getattr(simplified, "stype", None)
+    phi.guard = guard and simplify(guard, env=env)
+    names = free_vars(simplified)
+    if phi.guard is not None:
+      names = names | free_vars(phi.guard)
+    phi._env = _inherit_env(env, names, _bound_phis(env, free_vars(call_ast)))
+    phi._ns = None
+    phi._set_keys()
+    return phi
+
+  def _set_keys(self) -> None:
+    """Intern expr/guard so equality and hashing are O(1)."""
+    self._key = term_id(self.expr)
+    self._guard_key = None if self.guard is None else term_id(self.guard)
 
   # ---------------------------------------------------------------------
   #  functional behaviour
@@ -307,10 +440,13 @@ class PhiValue:
 
   def _clone(self, *, expr: ast.AST | None = None, env_overrides: Optional[dict[str, Any]] = None):
     clone = object.__new__(PhiValue)
-    clone.expr = copy.deepcopy(self.expr if expr is None else expr)
+    # ASTs are never mutated in place, so the clone can share them
+    clone.expr = self.expr if expr is None else expr
     clone.stype = self.stype
-    clone.guard = copy.deepcopy(self.guard)
+    clone.guard = self.guard
     clone._env = self._env if not env_overrides else self._env.new_child(dict(env_overrides))
+    clone._ns = None
+    clone._set_keys()
     return clone
 
   def __call__(self, *args: "PhiValue", **kwargs) -> Any:
@@ -337,24 +473,18 @@ class PhiValue:
       else:
         env_overrides[key] = value
     
-    # Attach type info BEFORE deepcopy so it gets copied
-    if self.stype is not None:
-      self.expr.stype = self.stype
-    for a in args:
-      if a.stype is not None:
-        a.expr.stype = a.stype
-    for kwarg in call_kwargs.values():
-      if kwarg.stype is not None:
-        kwarg.expr.stype = kwarg.stype
-    
+    # Operand ASTs are shared with the new Call rather than deep-copied;
+    # simplification is copy-on-write, so only rewritten paths are copied.
     call_ast = ast.Call(
-      func=copy.deepcopy(self.expr),
-      args=[copy.deepcopy(a.expr) for a in args],
-      keywords=[ast.keyword(arg=k, value=copy.deepcopy(call_kwargs[k].expr)) for k in call_kwargs]
+      func=_typed_expr(self),
+      args=[_typed_expr(a) for a in args],
+      keywords=[ast.keyword(arg=k, value=_typed_expr(call_kwargs[k])) for k in call_kwargs]
     )
     phi = PhiValue(call_ast)
+    phi._env = _inherit_env(phi._env, free_vars(phi.expr),
+                            (self, *args, *call_kwargs.values()))
     if env_overrides:
-      phi._env = self._env.new_child(env_overrides)
+      phi._env = phi._env.new_child(env_overrides)
     try:
       result = phi.eval()
       # Keep Python callables (e.g., lambda/function objects) as unevaluated
@@ -369,11 +499,33 @@ class PhiValue:
   #  evaluation helpers
   # ---------------------------------------------------------------------
 
+  def _namespace(self, code) -> dict[str, Any]:
+    """Globals for evaluating *code*: just the names it loads, plus builtins.
+
+    The names are read off *code* once per PhiValue and reused.  Each call
+    fills a fresh dict with their current values, so rebinding a notebook
+    global is seen, and a function returned by an earlier eval keeps the
+    globals it was made with.
+    """
+    cached = self._ns
+    if cached is not None and cached[0] is code:
+      names = cached[1]
+    else:
+      names = tuple(n for n in _code_names(code) if n != _UNDEF_NAME)
+      self._ns = (code, names)
+    env = self._env
+    ns = {"__builtins__": builtins.__dict__, _UNDEF_NAME: UNDEF}
+    for name in names:
+      value = env.get(name, _MISSING)
+      if value is not _MISSING:
+        ns[name] = value
+    return ns
+
   def eval(self) -> Any:
     """Evaluate the stored expression in its captured environment."""
-    # Python's eval requires a real dict for globals
-    env_dict = dict(self._env)
-    out = _eval_ast_with_guards(self.expr, env_dict)
+    code = _compile_with_guards(self.expr, self._key)
+    env_dict = self._namespace(code)
+    out = _eval_code(code, env_dict)
     if out is UNDEF:
       return UNDEF
     if self.stype == Type.t:
@@ -390,30 +542,14 @@ class PhiValue:
     return bool(self.eval())
 
   def __hash__(self):
-    guard_dump = None if self.guard is None else ast.dump(self.guard, annotate_fields=False)
-    return hash((
-      ast.dump(self.expr, annotate_fields=False),
-      self.stype,
-      guard_dump,
-    ))
+    return hash((self._key, self.stype, self._guard_key))
 
   def __eq__(self, other):
     if isinstance(other, PhiValue):
-      if (ast.dump(self.expr, annotate_fields=False) !=
-          ast.dump(other.expr, annotate_fields=False)):
-        return False
-
-      if self.stype != other.stype:
-        return False
-
-      if self.guard == other.guard == None:
-        return True
-
-      if self.guard is None or other.guard is None:
-        return False
-
-      return (ast.dump(self.guard, annotate_fields=False) ==
-                 ast.dump(other.guard, annotate_fields=False))
+      # term ids are canonical, so structural equality is id equality
+      return (self._key == other._key
+              and self.stype == other.stype
+              and self._guard_key == other._guard_key)
     
     try:
       return self.eval() == other
@@ -438,6 +574,31 @@ class PhiValue:
 # ---------------------------------------------------------------------------
 
 if __name__ == "__main__":
+  # A notebook cell runs as module code in the user namespace, below the
+  # kernel's own frames: its globals must stay live, bound before or after.
+  def run_cell(src, ns):
+    exec(compile(src, "<cell>", "exec"), ns)
+  user_ns = {"PhiValue": PhiValue}
+  run_cell("F = abs\nv = PhiValue('F(K)')", user_ns)
+  run_cell("K = -10", user_ns)
+  assert user_ns["v"].eval() == 10
+  run_cell("F = str", user_ns)
+  assert user_ns["v"].eval() == "-10"
+  # a function from an earlier eval keeps the bindings it was made with
+  run_cell("app = PhiValue('lambda y: F(y)')\nf = app.eval()\nF = abs", user_ns)
+  assert user_ns["app"].eval()(-1) == 1 and user_ns["f"](-1) == "-1"
+  wide = user_ns["app"]._clone(env_overrides={"F": float})
+  assert wide.eval()(-1) == -1.0 and user_ns["f"](-1) == "-1"
+  # function locals are captured by value, and outlive their frame
+  def make(k):
+    return PhiValue("k * 2")
+  assert make(4).eval() == 8 and make(5).eval() == 10
+  # each eval looks its code up once
+  before = CODE_CACHE.info()
+  make(6).eval()
+  after = CODE_CACHE.info()
+  assert after.hits + after.misses == before.hits + before.misses + 1
+
   id_ast = ast.parse("lambda x=t: x[t]", mode="eval").body
   id_pv = PhiValue(id_ast)
   two_pv = PhiValue(ast.parse("2", mode="eval").body)
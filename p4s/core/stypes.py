@@ -173,6 +173,52 @@ def takes(func: Any, arg: Any) -> bool:
   return bool(ft and ft.is_function and ft.domain == at)
 
 
+# ---------------------------------------------------------------------------
+#  Type patterns
+# ---------------------------------------------------------------------------
+# In a pattern, unknown atoms are wildcards: ``ANY`` matches any type, and
+# a named one such as ``Type(("?a",))`` must match the same type at every
+# occurrence, so ⟨?a,?b⟩ followed by ?a describes a function and its
+# argument.
+
+ANY = Type(("?",))
+
+
+def is_ground(stype: Type) -> bool:
+  """``True`` iff *stype* contains no unknown atoms."""
+  if stype.is_atomic:
+    return not stype.is_unknown
+  return is_ground(stype.domain) and is_ground(stype.range)
+
+
+def match_type(pattern: Type,
+               stype: Type | None,
+               bindings: Dict[str, Type] | None = None) -> Dict[str, Type] | None:
+  """Match *stype* against *pattern*; return the wildcard bindings or ``None``.
+
+  A missing or not fully known *stype* cannot be ruled out, so it matches
+  without binding anything.
+  """
+  bindings = {} if bindings is None else bindings
+  if stype is None or not is_ground(stype):
+    return bindings
+  if pattern.is_unknown:
+    name = pattern[0]
+    if name == "?":
+      return bindings
+    bound = bindings.get(name)
+    if bound is None:
+      bindings[name] = stype
+      return bindings
+    return bindings if bound == stype else None
+  if pattern.is_atomic or stype.is_atomic:
+    return bindings if pattern == stype else None
+  bindings = match_type(pattern.domain, stype.domain, bindings)
+  if bindings is None:
+    return None
+  return match_type(pattern.range, stype.range, bindings)
+
+
 # ---------------------------------------------------------------------------
 #  Tests (run ``python types.py``)
 # ---------------------------------------------------------------------------
@@ -233,6 +279,17 @@ def _run_tests() -> None:
   except TypeError as er:
     assert str(er) == "Invalid spec type: 123"
 
+  # -------------------------------------------------------------------
+  # Tests for type patterns
+  # -------------------------------------------------------------------
+  a, b = Type(("?a",)), Type(("?b",))
+  assert match_type(ANY, Type.eet) == {}
+  assert match_type(Type((a, b)), Type.et) == {"?a": Type.e, "?b": Type.t}
+  assert match_type(Type((a, a)), Type.et) is None
+  assert match_type(Type.et, Type.e) is None
+  assert match_type(Type.et, Type.fresh()) == {}
+  assert not is_ground(Type((Type.e, Type.fresh())))
+
   print("✅  All type‑system tests passed, including from_spec tests.")
 
 
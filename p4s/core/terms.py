@@ -0,0 +1,150 @@
+"""phosphorus.core.terms
+---------------------------------
+Hash‑consed term store.
+
+Every distinct AST *structure* is interned once and identified by a small
+integer.  Two subterms are structurally equal exactly when their term ids
+are equal, so equality and hashing of stored terms become O(1) instead of
+re‑serialising whole trees with ``ast.dump`` / ``ast.unparse``.
+
+Interning a tree is a single bottom‑up pass: each node's signature is its
+type, its scalar fields and the ids of its children, so the work per node
+is constant no matter how large the subtree is.  Ids are cached on the
+nodes, so only newly built nodes are ever interned.
+
+Location attributes (``lineno`` …) and engine annotations (``stype``,
+``guard``) are not part of a term's identity, matching
+``ast.dump(..., include_attributes=False)``.
+
+The table only holds weak references: the first node interned with a
+given structure is its *canonical* node, and every later node with that
+structure keeps the canonical one alive.  Once no node of a structure is
+left its entry goes away, so the table tracks the live terms rather than
+every term ever built.  Ids are never reused, so an id kept after its
+terms died (say, as a cache key) can never match a different term.
+"""
+
+from __future__ import annotations
+
+import ast
+import itertools
+import weakref
+from typing import Any
+
+
+class _Canonical(weakref.ref):
+  """Weak reference to a structure's canonical node, remembering the
+  signature it is filed under."""
+
+  __slots__ = ("sig",)
+
+
+class TermStore:
+  """Intern table mapping structural signatures to canonical term ids.
+
+  Each store caches a node's id on the node itself, so re-interning a tree
+  only does work for nodes created since the last call.  This relies on
+  the engine's copy-on-write discipline: interned nodes are never mutated
+  in place (see ``p4s.simplify.utils.CopyOnWriteTransformer``).
+  """
+
+  __slots__ = ("_table", "_attr", "_pin", "_ids")
+  _count = 0
+
+  def __init__(self) -> None:
+    self._table: dict[tuple, _Canonical] = {}
+    self._ids = itertools.count()
+    TermStore._count += 1
+    self._attr = f"_term_id_{TermStore._count}"
+    self._pin = f"_term_canon_{TermStore._count}"
+
+  def key(self, node: ast.AST) -> int:
+    """Return the canonical id of *node*'s structure."""
+    attr = self._attr
+    cached = node.__dict__.get(attr)
+    if cached is not None:
+      return cached
+
+    # explicit post-order walk: (node, children_done)
+    stack: list[tuple[ast.AST, bool]] = [(node, False)]
+    while stack:
+      current, ready = stack.pop()
+      if attr in current.__dict__:
+        continue
+      if not ready:
+        stack.append((current, True))
+        for child in ast.iter_child_nodes(current):
+          if attr not in child.__dict__:
+            stack.append((child, False))
+        continue
+      setattr(current, attr, self._intern(current))
+
+    return node.__dict__[attr]
+
+  def _intern(self, node: ast.AST) -> int:
+    attr = self._attr
+    parts: list[Any] = [type(node)]
+    for _, value in ast.iter_fields(node):
+      if isinstance(value, ast.AST):
+        parts.append(value.__dict__[attr])
+      elif isinstance(value, list):
+        parts.append(tuple(
+          v.__dict__[attr] if isinstance(v, ast.AST) else v for v in value
+        ))
+      else:
+        # Tag constants with their type so 1, 1.0 and True stay distinct.
+        parts.append((type(value), value))
+    sig = tuple(parts)
+    ref = self._table.get(sig)
+    canonical = ref() if ref is not None else None
+    if canonical is None:
+      ref = self._table[sig] = _Canonical(node, self._drop)
+      ref.sig = sig
+      return next(self._ids)
+    node.__dict__[self._pin] = canonical
+    return canonical.__dict__[attr]
+
+  def _drop(self, ref: _Canonical) -> None:
+    # the last node of a structure died
+    if self._table.get(ref.sig) is ref:
+      del self._table[ref.sig]
+
+  def __len__(self) -> int:
+    """Number of distinct live structures."""
+    return len(self._table)
+
+
+# Process-wide store; ids are only comparable within one store.
+TERMS = TermStore()
+
+
+def term_id(node: ast.AST) -> int:
+  """Canonical structural id of *node* in the shared :data:`TERMS` store."""
+  return TERMS.key(node)
+
+
+__all__ = ["TermStore", "TERMS", "term_id"]
+
+
+if __name__ == "__main__":
+  a = ast.parse("lambda x: LOVE(x, 'M') % G", mode="eval").body
+  b = ast.parse("lambda x:  LOVE(x,'M')  %  G", mode="eval").body
+  c = ast.parse("lambda y: LOVE(y, 'M') % G", mode="eval").body
+  assert term_id(a) == term_id(b)
+  assert term_id(a) != term_id(c)
+  assert term_id(ast.Constant(1)) != term_id(ast.Constant(True))
+  assert term_id(a.body.right) == term_id(ast.Name(id="G", ctx=ast.Load()))
+
+  # entries live exactly as long as some node of their structure
+  store = TermStore()
+  d = ast.parse("f(x)", mode="eval").body
+  e = ast.parse("f(x)", mode="eval").body
+  size, d_id = len(store), store.key(d)
+  assert store.key(e) == d_id and len(store) == size + 4
+  del d
+  assert len(store) == size + 4 and store.key(ast.parse("f(x)", mode="eval").body) == d_id
+  del e
+  assert len(store) <= size + 1             # the parser shares one Load() node
+  # ids are never reused: a stale id matches nothing built later
+  assert store.key(ast.parse("f(x)", mode="eval").body) != d_id
+  print("✅ term store sanity tests passed.")
@@ -25,10 +25,14 @@ import logging
 from p4s.semantics.interpret import Interpreter, UNDEF
 from p4s.syntax.tree           import Tree
 from p4s.core.phivalue         import PhiValue
-from p4s.core.stypes           import takes
+from p4s.core.stypes           import Type, takes
 
 __all__ = ["register_ch3"]
 
+# FA applies a function ⟨σ,τ⟩ to a σ, in either order
+_S, _T = Type(("?σ",)), Type(("?τ",))
+FA_TYPES = [(Type((_S, _T)), _S), (_S, Type((_S, _T)))]
+
 # ——————————————————————————————————————————————
 # Rule registration
 # ——————————————————————————————————————————————
@@ -44,13 +48,13 @@ def register_ch3(interp: Interpreter) -> None:
 
   # ——— NN ————————————————————————————————————————————
   @interp.rule()
-  def NN(child: PhiValue):
+  def NN(alpha: Tree, child: PhiValue):
     """Non‑branching Node: pass child meaning unchanged."""
     return child
 
   # ——— FA ————————————————————————————————————————————
-  @interp.rule()
-  def FA(beta: PhiValue, gamma: PhiValue):
+  @interp.rule(types=FA_TYPES)
+  def FA(alpha: Tree, beta: PhiValue, gamma: PhiValue):
     """Functional Application (order determined by `takes`)."""
     if takes(beta, gamma):
       fn, arg = beta, gamma
@@ -59,8 +63,7 @@ def register_ch3(interp: Interpreter) -> None:
     else:
       return UNDEF
 
-    result_type = fn.stype.range  # safe given `takes` check
-    return PhiValue('fn(arg)', stype=result_type)
+    return fn.apply(arg)  # typed ⟨σ,τ⟩ given the `takes` check, so τ
 
 # ——————————————————————————————————————————————
 # Self‑contained sanity tests
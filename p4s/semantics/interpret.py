@@ -20,23 +20,49 @@ Sentinels
 * **VACUOUS** – ignorable material (e.g. punctuation, unknown lexical)
 * **UNDEF**   – undefined result *or* rule‑skip marker
 
+Dispatch
+~~~~~~~~
+Each rule is compiled once, when it is registered, into its accepted
+argument count (read from its signature) and, optionally, the node labels
+it applies to (``labels=`` on ``rule``/``add_rule``).  At a node only the
+rules that accept its label and number of non‑vacuous children are tried,
+in registration order; the candidate list is cached per (arity, label).
+
+A rule may also declare the ``stype`` patterns its children must have
+(``types=``: one pattern per child, or a list of alternative tuples; see
+``p4s.core.stypes.match_type`` for wildcards).  Declaring types promises
+that whether the rule applies depends only on the children's types: when
+it returns ``UNDEF`` for some tuple of (fully known) child types, it is
+not tried again on children of those types.
+
+Memo
+~~~~
+Denotations are memoised per subtree, keyed by the subtree's structure
+(labels and leaves), so repeated constituents and re-run trees are
+computed once.  The memo is dropped whenever the lexicon or the rule list
+changes.  Pass ``memo=False`` to disable it.
+
 Logging (``logging.DEBUG``)
 ~~~~~~~~~~~~~~~~~~~~~~~~~~~
 * removal of *VACUOUS* children
 * a node collapsing to *VACUOUS*
-* arity mismatches or exceptions inside rule trials
+* exceptions inside rule trials
 """
 
 import ast
 import logging
+from dataclasses import dataclass
 from functools import wraps
 from inspect import Parameter, signature
-from typing import Any, Callable, Mapping
+from typing import (Any, Callable, Collection, Hashable, Iterable, Iterator,
+                    Mapping, Sequence)
 
 from IPython.display import Markdown, display
 
 from p4s.syntax.tree import Tree
+from p4s.core.cache import LRUCache
 from p4s.core.phivalue import PhiValue
+from p4s.core.stypes import Type, is_ground, match_type
 from p4s.core.constants import UNDEF, VACUOUS
 
 
@@ -45,18 +71,57 @@ logger.addHandler(logging.NullHandler())
 
 __all__ = ["Interpreter", "defined", "rule"]
 
-def rule(fn: Callable | None = None, *, index: int | None = None):
+def rule(fn: Callable | None = None,
+         *,
+         index: int | None = None,
+         labels: Collection[Hashable] | None = None,
+         types: Sequence | None = None):
   """Mark an Interpreter method for auto-registration on instance init."""
   if fn is None:
-    return lambda f: rule(f, index=index)
+    return lambda f: rule(f, index=index, labels=labels, types=types)
   setattr(fn, "__interp_rule__", True)
   setattr(fn, "__interp_rule_index__", index)
+  setattr(fn, "__interp_rule_labels__", labels)
+  setattr(fn, "__interp_rule_types__", types)
   return fn
 
 # ——————————————————————————————————————————————
 # Helpers
 # ——————————————————————————————————————————————
 
+def as_tree(tree):
+  """Parse bracketed strings and nested lists into a ``Tree``."""
+  match tree:
+    case str() if tree.startswith('('):
+      tree = Tree.fromstring(tree)
+
+    case Tree():
+      pass
+    
+    case [*_]:
+      tree = Tree.fromlist(tree)
+  return tree
+
+def evaluate(val: Any) -> Any:
+  """Evaluate a denotation as far as it goes (the displayed "Result")."""
+  try:
+    out = val.eval()
+    seen: set[int] = set()
+    while isinstance(out, PhiValue):
+      ident = id(out)
+      if ident in seen:
+        break
+      seen.add(ident)
+      nxt = out.eval()
+      if nxt is out:
+        break
+      out = nxt
+    # if callable(out):
+    #   out = val
+  except Exception:
+    out = UNDEF if isinstance(val, PhiValue) else val
+  return out
+
 def defined(value: Any) -> bool:
   """Check if a value is defined (not UNDEF/None)."""
   if isinstance(value, PhiValue):
@@ -72,6 +137,113 @@ def defined(value: Any) -> bool:
       return True
   return value is not None and value is not UNDEF
 
+@dataclass(frozen=True, slots=True)
+class _CompiledRule:
+  """A rule with its applicability conditions read off once."""
+  fn: Callable
+  min_args: float
+  max_args: float
+  labels: frozenset | None
+  types: tuple[tuple[Type, ...], ...] | None = None
+
+  def accepts(self, n_args: int, label: Hashable) -> bool:
+    return (self.min_args <= n_args <= self.max_args
+            and (self.labels is None or label in self.labels)
+            and (self.types is None
+                 or any(len(sig) == n_args - 1 for sig in self.types)))
+
+  def admits(self, child_types: tuple) -> bool:
+    """Do *child_types* match one of the declared patterns?"""
+    for sig in self.types:
+      if len(sig) != len(child_types):
+        continue
+      bindings: dict | None = {}
+      for pattern, stype in zip(sig, child_types):
+        bindings = match_type(pattern, stype, bindings)
+        if bindings is None:
+          break
+      else:
+        return True
+    return False
+
+
+def _compile_rule(fn: Callable,
+                  labels: Collection[Hashable] | None = None,
+                  types: Sequence | None = None) -> _CompiledRule:
+  """Read the positional arity of *fn* (alpha + children) from its signature."""
+  labels, types = _label_set(labels), _type_signatures(types)
+  try:
+    params = list(signature(fn).parameters.values())
+  except (TypeError, ValueError):
+    # Could not introspect; assume it might work
+    return _CompiledRule(fn, 0, float('inf'), labels, types)
+  fixed_pos = [p for p in params if p.kind in (Parameter.POSITIONAL_ONLY,
+                                               Parameter.POSITIONAL_OR_KEYWORD)]
+  has_var_pos = any(p.kind == Parameter.VAR_POSITIONAL for p in params)
+  min_needed = sum(1 for p in fixed_pos if p.default is Parameter.empty)
+  max_allowed = float('inf') if has_var_pos else len(fixed_pos)
+  return _CompiledRule(fn, min_needed, max_allowed, labels, types)
+
+
+def _label_set(labels: Collection[Hashable] | None) -> frozenset | None:
+  if labels is None:
+    return None
+  if isinstance(labels, str):
+    labels = (labels,)
+  return frozenset(labels)
+
+
+def _type_signatures(types: Sequence | None) -> tuple[tuple[Type, ...], ...] | None:
+  """Normalise ``types=``: a tuple of child patterns, or a list of such."""
+  if types is None:
+    return None
+  if all(isinstance(t, Type) for t in types):
+    types = [types]
+  return tuple(tuple(sig) for sig in types)
+
+# _try_rule result for a rule that raised
+_RAISED = object()
+
+class _Lexicon(dict):
+  """Lexicon dict that counts its mutations (for the denotation memo)."""
+
+  def __init__(self, *args, **kwargs):
+    super().__init__(*args, **kwargs)
+    self.version = 0
+
+  def __setitem__(self, key, value):
+    super().__setitem__(key, value)
+    self.version += 1
+
+  def __delitem__(self, key):
+    super().__delitem__(key)
+    self.version += 1
+
+  def __ior__(self, other):
+    self.update(other)
+    return self
+
+  def update(self, *args, **kwargs):
+    super().update(*args, **kwargs)
+    self.version += 1
+
+  def setdefault(self, key, default=None):
+    if key not in self:
+      self.version += 1
+    return super().setdefault(key, default)
+
+  def pop(self, *args):
+    self.version += 1
+    return super().pop(*args)
+
+  def popitem(self):
+    self.version += 1
+    return super().popitem()
+
+  def clear(self):
+    super().clear()
+    self.version += 1
+
 # ——————————————————————————————————————————————
 # Interpreter
 # ——————————————————————————————————————————————
@@ -79,21 +251,44 @@ def defined(value: Any) -> bool:
 class Interpreter:
   """Bundle of a *lexicon* and an ordered list of composition *rules*."""
 
+  MEMO_SIZE = 4096
+  TREE_IDS_SIZE = 16 * MEMO_SIZE
+
   def __init__(self,
                lexicon: Mapping[str, Any] | None = None,
                *,
-               rules: list[Callable] | None = None) -> None:
-    self.lexicon: dict[str, Any] = {}
+               rules: list[Callable] | None = None,
+               memo: bool = True) -> None:
+    self.lexicon = {}
     for k, v in (lexicon or {}).items():
       self[k] = v
 
     self.rules: list[Callable] = list(rules or [])
+    # rule -> _CompiledRule, and (arity, label) -> candidate rules in order
+    self._compiled: dict[Callable, _CompiledRule] = {}
+    self._dispatch: dict[tuple, tuple[_CompiledRule, ...]] = {}
+    self._dispatch_rules: tuple = ()
+    # (rule, child types) pairs a typed rule returned UNDEF for
+    self._rejected: set[tuple] = set()
     if rules is None:
       self._register_marked_rules()
 
+    # subtree structure -> (denotation, rule); see _compute
+    self.memo: LRUCache | None = LRUCache(self.MEMO_SIZE) if memo else None
+    self._memo_epoch: tuple | None = None
+    self._tree_ids: dict[tuple, int] = {}
+
+  @property
+  def lexicon(self) -> dict[str, Any]:
+    return self._lexicon
+
+  @lexicon.setter
+  def lexicon(self, value: Mapping[str, Any]) -> None:
+    self._lexicon = value if isinstance(value, _Lexicon) else _Lexicon(value)
+
   def _register_marked_rules(self) -> None:
     """Register @rule-marked methods from base classes + subclass."""
-    specs: dict[str, int | None] = {}
+    specs: dict[str, tuple[int | None, Any]] = {}
     order: list[str] = []
 
     # base -> subclass (stable order, subclass can override index)
@@ -102,23 +297,31 @@ class Interpreter:
         if callable(obj) and getattr(obj, "__interp_rule__", False):
           if name not in specs:
             order.append(name)
-          specs[name] = getattr(obj, "__interp_rule_index__", None)
+          specs[name] = (getattr(obj, "__interp_rule_index__", None),
+                         getattr(obj, "__interp_rule_labels__", None),
+                         getattr(obj, "__interp_rule_types__", None))
 
     for name in order:
       # bound method: self already attached
-      self.add_rule(getattr(self, name), index=specs[name])
-
-  def rule(self, fn: Callable | None = None, *, index: int | None = None):
+      index, labels, types = specs[name]
+      self.add_rule(getattr(self, name), index=index, labels=labels, types=types)
+
+  def rule(self,
+           fn: Callable | None = None,
+           *,
+           index: int | None = None,
+           labels: Collection[Hashable] | None = None,
+           types: Sequence | None = None):
     """Decorator: @interp.rule() registers a post-init function rule."""
     if fn is None:
-      return lambda f: self.rule(f, index=index)
+      return lambda f: self.rule(f, index=index, labels=labels, types=types)
 
     @wraps(fn)
     def wrapped_rule(node, *child_args):
       result = fn(node, *child_args)
       return UNDEF if result is None else result
 
-    self.add_rule(wrapped_rule, index=index)
+    self.add_rule(wrapped_rule, index=index, labels=labels, types=types)
     return fn
 
   # ――― helpers ――――――――――――――――――――――――――――――――――――
@@ -126,7 +329,15 @@ class Interpreter:
     """Return lexicon entry for *word* (case‑insensitive) or VACUOUS."""
     return self.lexicon.get(word.lower(), VACUOUS)
 
-  def add_rule(self, fn: Callable, *, index: int | None = None) -> None:
+  def add_rule(self,
+               fn: Callable,
+               *,
+               index: int | None = None,
+               labels: Collection[Hashable] | None = None,
+               types: Sequence | None = None) -> None:
+    """Register *fn*, optionally only for nodes labelled one of *labels*
+    and/or children whose types match one of the patterns in *types*."""
+    self._compiled[fn] = _compile_rule(fn, labels, types)
     if index is None:
       self.rules.append(fn)
     else: 
@@ -134,42 +345,49 @@ class Interpreter:
 
   # ――― public API ――――――――――――――――――――――――――――――――
   def interpret(self, tree: Tree, *extra_args):
-    match tree:
-      case str() if tree.startswith('('):
-        tree = Tree.fromstring(tree)
-
-      case Tree():
-        pass
-      
-      case [*_]:
-        tree = Tree.fromlist(tree)
-
-    val = self._compute(tree)
+    tree = as_tree(tree)
+    val = self.denote(tree)
     if isinstance(tree, Tree):
       display(tree)
     if extra_args and callable(val):
       val = val(*extra_args)
 
-    try:
-      out = val.eval()
-      seen: set[int] = set()
-      while isinstance(out, PhiValue):
-        ident = id(out)
-        if ident in seen:
-          break
-        seen.add(ident)
-        nxt = out.eval()
-        if nxt is out:
-          break
-        out = nxt
-      # if callable(out):
-      #   out = val
-    except Exception:
-      out = UNDEF if isinstance(val, PhiValue) else val
-
+    out = evaluate(val)
     display(Markdown(f"**Result:** `{out}`"))
     return val
 
+  def denote(self, tree) -> Any:
+    """The denotation of *tree*, computed headlessly.
+
+    *tree* is a ``Tree`` (annotated with ``sem``/``rule`` in place, as by
+    :meth:`interpret`), a bracketed string or a leaf token.  Nothing is
+    displayed and no extra arguments are applied.
+    """
+    return self._compute(as_tree(tree))
+
+  def iter_interpret(self, trees: Iterable) -> Iterator["Interpretation"]:
+    """Interpret trees (or bracketed strings) one by one, headlessly.
+
+    Yields lightweight result records instead of displaying anything; see
+    :func:`p4s.semantics.batch.iter_interpret`.
+    """
+    from p4s.semantics.batch import iter_interpret
+    return iter_interpret(self, trees)
+
+  def interpret_many(self,
+                     trees: Iterable,
+                     *,
+                     workers: int | None = None,
+                     chunksize: int = 32,
+                     ordered: bool = True) -> Iterator["Interpretation"]:
+    """Interpret many trees on a process pool, yielding result records.
+
+    See :func:`p4s.semantics.batch.interpret_many`.
+    """
+    from p4s.semantics.batch import interpret_many
+    return interpret_many(self, trees, workers=workers,
+                          chunksize=chunksize, ordered=ordered)
+
   def __getitem__(self, item):
     if isinstance(item, str) and not item.startswith('('):
       return self.lookup(item)
@@ -184,15 +402,145 @@ class Interpreter:
     for k, v in mapping.items():
       self[k] = v
 
-  # ――― core recursive worker ――――――――――――――――――――――
-  def _compute(self, node):
-    """Compute denotation for *node* (``Tree`` **or** leaf token)."""
+  # ――― denotation memo ――――――――――――――――――――――――――
+  def clear_memo(self) -> None:
+    """Forget all memoised subtree denotations."""
+    if self.memo is not None:
+      self.memo.clear()
+    self._tree_ids.clear()
+
+  def _memo_keys(self, root) -> dict[int, int] | None:
+    """Structural key of every subtree of *root*, by ``id`` of the node.
+
+    Keys are interned ids of (label, child keys) / leaf tokens, computed
+    bottom-up, and are only valid while the lexicon and rules are
+    unchanged; the memo is dropped when either changes.
+    """
+    if self.memo is None:
+      return None
+    epoch = (id(self._lexicon), self._lexicon.version, tuple(self.rules))
+    if epoch != self._memo_epoch:
+      self.clear_memo()
+      self._memo_epoch = epoch
+    elif len(self._tree_ids) > self.TREE_IDS_SIZE:
+      # structure ids outlive the memo entries they key: start afresh
+      self.clear_memo()
+
+    keys: dict[int, int] = {}
+    ids = self._tree_ids
+
+    # explicit post-order walk: (node, children_done)
+    stack: list[tuple[Any, bool]] = [(root, False)]
+    while stack:
+      node, ready = stack.pop()
+      if isinstance(node, Tree):
+        if not ready:
+          stack.append((node, True))
+          stack.extend((ch, False) for ch in node)
+          continue
+        child_keys = tuple(keys.get(id(ch)) for ch in node)
+        if None in child_keys:
+          continue
+        sig = (Tree, node.label(), child_keys)
+      else:
+        sig = (type(node), node)
+      try:
+        keys[id(node)] = ids.setdefault(sig, len(ids))
+      except TypeError:  # unhashable label or leaf: not memoisable
+        pass
+    return keys
+
+  def _recall(self, root, keys: dict[int, int]) -> None:
+    """Re-attach memoised ``sem``/``rule`` to *root*'s subtree for display.
+
+    Only what :meth:`_compute_node` would have set is restored: both for a
+    node a rule succeeded at, ``sem`` alone for a Tree no rule did.
+    """
+    stack = [root]
+    while stack:
+      node = stack.pop()
+      entry = self.memo.peek(keys.get(id(node)))
+      if entry is not None:
+        val, rule = entry
+        try:
+          if rule is not None:
+            node.sem, node.rule = val, rule
+          elif isinstance(node, Tree):
+            node.sem = val
+        except: pass
+      if isinstance(node, Tree):
+        stack.extend(node)
+
+  # ――― rule dispatch ――――――――――――――――――――――――――――
+  def _candidates(self, n_args: int, label: Hashable) -> tuple[_CompiledRule, ...]:
+    """Rules that accept *n_args* arguments at a node labelled *label*."""
+    key = (n_args, label)
+    try:
+      return self._dispatch[key]
+    except KeyError:
+      pass
+    except TypeError:  # unhashable label
+      key = None
+    compiled = self._compiled
+    for fn in self._dispatch_rules:
+      if fn not in compiled:
+        compiled[fn] = _compile_rule(fn)
+    candidates = tuple(c for fn in self._dispatch_rules
+                       if (c := compiled[fn]).accepts(n_args, label))
+    if key is not None:
+      self._dispatch[key] = candidates
+    return candidates
+
+  def _sync_dispatch(self) -> None:
+    """Drop cached candidate lists if the rule list changed since."""
+    rules = tuple(self.rules)
+    if rules != self._dispatch_rules:
+      self._dispatch.clear()
+      self._rejected.clear()
+      self._dispatch_rules = rules
+
+  # ――― core worker ――――――――――――――――――――――――――――――
+  def _compute(self, root):
+    """Compute denotation for *root* (``Tree`` **or** leaf token).
+
+    Post-order over an explicit stack, so tree depth is not limited by
+    the recursion limit.  Children are completed left to right before
+    their parent, exactly as a recursive evaluation would, so a subtree
+    repeating an earlier sibling is a memo hit.
+    """
+    self._sync_dispatch()
+    keys = self._memo_keys(root)
+    memo = self.memo if keys is not None else None
+    values: dict[int, Any] = {}  # id(node) -> denotation
+
+    # (node, children_done)
+    stack: list[tuple[Any, bool]] = [(root, False)]
+    while stack:
+      node, ready = stack.pop()
+      key = keys.get(id(node)) if memo is not None else None
+      if not ready:
+        if key is not None:
+          entry = memo.get(key)
+          if entry is not None:
+            self._recall(node, keys)
+            values[id(node)] = entry[0]
+            continue
+        if isinstance(node, Tree):
+          stack.append((node, True))
+          stack.extend((ch, False) for ch in reversed(node))
+          continue
 
-    child_vals = []
-    if isinstance(node, Tree):
       # 1. Gather child denotations (empty for leaf tokens)
-      child_vals = [self._compute(ch) for ch in node]
-  
+      child_vals = [values[id(ch)] for ch in node] if isinstance(node, Tree) else []
+      val, rule = self._compute_node(node, child_vals)
+      if key is not None:
+        memo.put(key, (val, rule))
+      values[id(node)] = val
+    return values[id(root)]
+
+  def _compute_node(self, node, child_vals: list[Any]):
+    """Apply the rules at *node*; returns ``(denotation, rule)``."""
+    if isinstance(node, Tree):
       # 2. Filter VACUOUS children (log indices removed)
       non_vac: list[Any] = []
       for idx, val in enumerate(child_vals):
@@ -206,52 +554,136 @@ class Interpreter:
       if not non_vac:
         logger.debug("Node %s became VACUOUS (no non‑vacuous children)", node.label())
         node.sem = VACUOUS
-        return VACUOUS
+        return VACUOUS, None
         
       child_vals = non_vac
 
-    # Try rules in order
-    for rule in self.rules:
+    # Try the applicable rules in order
+    label = node.label() if isinstance(node, Tree) else None
+    child_types = None
+    for compiled in self._candidates(1 + len(child_vals), label):
+      rule = compiled.fn
+      rejected_key = None
+      if compiled.types is not None:
+        if child_types is None:
+          child_types = tuple(getattr(v, "stype", None) for v in child_vals)
+        if not compiled.admits(child_types):
+          continue
+        if child_types and all(isinstance(t, Type) and is_ground(t) for t in child_types):
+          rejected_key = (rule, child_types)
+          if rejected_key in self._rejected:
+            continue
       val = self._try_rule(rule, node, child_vals)
-      if val is not UNDEF:
-        try:
-          node.sem = val
-          node.rule = rule
-        except: pass
-        return val
+      if val is _RAISED:
+        continue
+      if val is UNDEF:
+        if rejected_key is not None:
+          self._rejected.add(rejected_key)
+        continue
+      try:
+        node.sem = val
+        node.rule = rule
+      except: pass
+      return val, rule
 
     # 5. No rule succeeded
     if isinstance(node, Tree):
       logger.debug("No rule succeeded on node %s", node.label())
       node.sem = UNDEF
-    return UNDEF
+    return UNDEF, None
 
   # ――― safe rule invocation ――――――――――――――――――――――
   @staticmethod
   def _try_rule(rule: Callable, node, child_args: list[Any]):
-    """Attempt to apply *rule* to *alpha=node* followed by *child_args*."""
-    # 1. Arity check: rule expects 1 + len(child_args) positional arguments
-    try:
-      sig = signature(rule)
-      params = list(sig.parameters.values())
-      fixed_pos = [p for p in params if p.kind in (Parameter.POSITIONAL_ONLY,
-                                                   Parameter.POSITIONAL_OR_KEYWORD)]
-      has_var_pos = any(p.kind == Parameter.VAR_POSITIONAL for p in params)
-      expected_args = 1 + len(child_args)  # 1 for alpha + children
-      min_needed = sum(1 for p in fixed_pos if p.default is Parameter.empty)
-      max_allowed = float('inf') if has_var_pos else len(fixed_pos)
-      if not (min_needed <= expected_args <= max_allowed):
-        lbl = node.label() if isinstance(node, Tree) else str(node)
-        logger.debug("Arity mismatch for rule %s on node %s", rule.__name__, lbl)
-        return UNDEF
-    except (TypeError, ValueError):
-      # Could not introspect; assume it might work
-      pass
+    """Apply *rule* to *alpha=node* followed by *child_args*.
 
-    # 2. Call the rule with alpha as first positional arg, followed by child_args
+    Arity and labels were already checked by the dispatch table.  Returns
+    ``_RAISED`` if the rule raised, which (unlike ``UNDEF``) may depend on
+    more than the children's types.
+    """
     try:
       result = rule(node, *child_args)
       return UNDEF if result is None else result
     except Exception as exc:
       logger.debug("Rule %s raised %s", rule.__name__, exc)
-      return UNDEF
\ No newline at end of file
+      return _RAISED
+
+# ——————————————————————————————————————————————
+# Self‑contained sanity tests
+# ——————————————————————————————————————————————
+
+if __name__ == "__main__":
+  from p4s.semantics.ch3 import _build_lexicon, register_ch3
+
+  def marks(tree):
+    nodes = [*tree.subtrees(), *tree.leaves()]
+    return [(str(n), repr(getattr(n, "sem", None)), getattr(n, "rule", None))
+            for n in nodes]
+
+  interp = Interpreter(lexicon=_build_lexicon())
+  register_ch3(interp)
+  # unknown words are UNDEF here rather than VACUOUS
+  interp.rules = [r for r in interp.rules if r.__name__ != "TN"]
+
+  @interp.rule(index=0)
+  def LEX(alpha: str = ""):
+    return interp.lexicon.get(alpha.lower(), UNDEF)
+
+  # a memo hit shows exactly what the first run showed
+  src = "(S (N John) (VP (V loves) (N Mary)) (X zzz) (Y))"
+  first, again = as_tree(src), as_tree(src)
+  interp.denote(first)
+  hits = interp.memo.hits
+  interp.denote(again)
+  assert interp.memo.hits > hits and marks(again) == marks(first)
+  assert getattr(again.leaves()[-1], "sem", None) is None  # zzz: no rule applied
+
+  # structure ids are dropped with the memo once they outgrow their bound
+  interp.TREE_IDS_SIZE = 8
+  for name in ("John", "Mary", "zzz"):
+    interp.denote(f"(S (N {name}) (V runs))")
+    assert len(interp._tree_ids) <= 8 + 6
+
+  # dispatch: arity, labels and type patterns; typed UNDEFs are remembered
+  from p4s.core.stypes import Type
+
+  class V:
+    def __init__(self, name, stype):
+      self.name, self.stype = name, stype
+
+  a, b = Type(("?a",)), Type(("?b",))
+  calls = []
+
+  def make(memo):
+    d = Interpreter({"john": V("j", Type.e), "runs": V("run", Type.et)},
+                    rules=[], memo=memo)
+    d.add_rule(lambda alpha: d.lexicon.get(alpha, UNDEF))
+    d.add_rule(lambda node, x: x, labels=("N", "V"))
+
+    def NOPE(node, x, f):
+      calls.append(node.label())
+
+    def FA(node, f, x):
+      if f.stype.is_atomic:
+        f, x = x, f
+      return V(f"{f.name}({x.name})", f.stype.range)
+
+    d.add_rule(NOPE, types=(Type.e, Type.et))
+    d.add_rule(FA, types=[(Type((a, b)), a), (a, Type((a, b)))])
+    return d
+
+  d = make(memo=False)
+  assert d.denote("(N john)").name == "j" and d.denote("(X john)") is UNDEF
+  assert d.denote("(S (N john) (V runs))").name == "run(j)" and calls == ["S"]
+  assert d.denote("(T (N john) (V runs))").name == "run(j)" and calls == ["S"]
+  assert d.denote("(S (N john) (N john))") is UNDEF    # FA does not admit (e, e)
+  d.add_rule(lambda node, x, y: UNDEF, index=0)         # new rules: forget rejections
+  d.denote("(S (N john) (V runs))")
+  assert calls == ["S", "S"]
+
+  # the denotation memo is dropped when the lexicon changes
+  d = make(memo=True)
+  assert d.denote("(S (N john) (V runs))").name == "run(j)"
+  d["john"] = V("m", Type.e)
+  assert d.denote("(S (N john) (V runs))").name == "run(m)"
+  print("✅ Interpreter sanity tests passed.")
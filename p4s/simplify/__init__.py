@@ -1,22 +1,26 @@
 # phosphorus/simplify/__init__.py
-from .passes import PASS_PIPELINE
-from .utils  import capture_env
+from .passes import PASS_PIPELINE, pipeline_version
+from .utils  import capture_env, free_vars
+from .memo   import SIMPLIFY_MEMO
+from .fused  import mark_normal, run_passes
+from .macro_pass import MACROS, macro, macro_chain
 import ast
 from typing import Union
 
-__all__ = ["simplify", "run_pass_tests"]
+__all__ = ["simplify", "run_pass_tests", "SIMPLIFY_MEMO", "MACROS", "macro"]
 
 
-def simplify(expr: Union[str, ast.AST], *, max_iter: int = 5, env: dict | None = None) -> ast.AST:
+def simplify(expr: Union[str, ast.AST], *, max_iter: int = 5, env: dict | None = None,
+             memo: bool | None = None) -> ast.AST:
   """
   Simplify a Python expression, given as a source string or AST, and
   return the simplified AST. Uses PASS_PIPELINE to transform the AST
   until it stabilizes or max_iter is reached. Optional env override.
-  """
-  # prepare environment
-  if env is None:
-    env = capture_env()
 
+  With ``memo=True`` (or ``SIMPLIFY_MEMO.enable()`` and ``memo=None``)
+  results are memoised on the input term and the env bindings the passes
+  consulted; see :mod:`p4s.simplify.memo`.
+  """
   # parse or accept AST
   if isinstance(expr, str):
     expr_ast = ast.parse(expr, mode="eval").body  # type: ignore[assignment]
@@ -25,20 +29,52 @@ def simplify(expr: Union[str, ast.AST], *, max_iter: int = 5, env: dict | None =
   else:
     raise TypeError("simplify() expects a source-code string or ast.AST")
 
-  # fixed-point iteration over passes
+  # prepare environment: the caller's bindings of the free names
+  if env is None:
+    env = capture_env(names=free_vars(expr_ast))
+
+  if SIMPLIFY_MEMO.enabled if memo is None else memo:
+    config = (tuple(PASS_PIPELINE), max_iter)
+    return SIMPLIFY_MEMO.simplify(
+      expr_ast, env, config,
+      lambda tree, recorded_env: _run_pipeline(tree, recorded_env, max_iter),
+    )
+  return _run_pipeline(expr_ast, env, max_iter)
+
+
+def _run_pipeline(expr_ast: ast.AST, env, max_iter: int) -> ast.AST:
+  # fixed-point iteration over fused rounds of the pipeline; subtrees
+  # already normal under this pipeline version are skipped
+  version = pipeline_version()
   for _ in range(max_iter):
-    old_dump = ast.dump(expr_ast, annotate_fields=False)
-    for pass_cls in PASS_PIPELINE:
-      expr_ast = pass_cls(env).visit(expr_ast)
-    ast.fix_missing_locations(expr_ast)
-    if ast.dump(expr_ast, annotate_fields=False) == old_dump:
+    expr_ast, modified = run_passes(PASS_PIPELINE, expr_ast, env, max_iter, version)
+    if not modified:
       break
   else:
     raise RuntimeError("simplify() did not converge within max_iter passes")
 
+  # also fills in missing source locations, like ast.fix_missing_locations
+  mark_normal(expr_ast, version)
   return expr_ast
 
 
+# (src, env, outer, outer env, expected): *src* is simplified under *env*,
+# spliced into *outer* for HOLE, and the whole simplified under *outer env*
+SPLICE_TESTS = [
+  ("defined(x)", {}, "f(HOLE)", {"x": len}, "f(True)"),
+  ("macro_chain(a)", {}, "f(HOLE)", {"macro_chain": macro_chain}, "f((a,))"),
+  ("x", {}, "f(HOLE)", {"x": 1}, "f(1)"),
+]
+
+
+class _Splice(ast.NodeTransformer):
+  def __init__(self, tree: ast.AST):
+    self.tree = tree
+
+  def visit_Name(self, node: ast.Name) -> ast.AST:
+    return self.tree if node.id == "HOLE" else node
+
+
 def run_pass_tests():
   """
   Run TESTS for each pass through the full pipeline.
@@ -63,6 +99,34 @@ def run_pass_tests():
       print(f"{src!r} -> {out!r}    [{status}]")
     print()
 
+  # normal subtrees spliced into a term simplified under another env
+  print("== Splice tests ==")
+  for src, inner_env, outer, outer_env, expected in SPLICE_TESTS:
+    inner = simplify(src, env=inner_env)
+    tree = _Splice(inner).visit(parse(outer, mode="eval").body)
+    out = unparse(simplify(tree, env=outer_env))
+    status = 'OK' if out == expected else f"FAIL (got {out!r})"
+    print(f"{src!r} in {outer!r} -> {out!r}    [{status}]")
+  print()
+
+  # every β-reduction engine on the shared BetaReducer tests
+  from .passes import BETA_ENGINES, select_beta_engine
+  from .lambda_pass import BetaReducer
+  saved = [cls for cls in PASS_PIPELINE if cls in BETA_ENGINES.values()]
+  try:
+    for name in BETA_ENGINES:
+      print(f"== Beta engine tests ({name}) ==")
+      select_beta_engine(name)
+      for src, expected in BetaReducer.TESTS:
+        out = unparse(simplify(src, env={}))
+        status = 'OK' if out == expected else f"FAIL (got {out!r})"
+        print(f"{src!r} -> {out!r}    [{status}]")
+      print()
+  finally:
+    for i, cls in enumerate(PASS_PIPELINE):
+      if cls in BETA_ENGINES.values():
+        PASS_PIPELINE[i] = saved.pop(0)
+
   # integration tests, if present
   INTEGRATION_TESTS = globals().get('INTEGRATION_TESTS')
   if INTEGRATION_TESTS:
@@ -0,0 +1,296 @@
+# phosphorus/simplify/fused.py
+"""
+Fused pass pipeline.
+
+Running ``PASS_PIPELINE`` pass by pass walks the whole tree once per pass
+and per fixed-point iteration.  ``FusedRewriter`` instead applies the
+rules of every rule-based pass (see ``SimplifyPass``) in a *single*
+bottom-up traversal:
+
+  • at each node the ``enter_`` hooks of the active passes run, then the
+    children are rewritten, then the ``exit_`` hooks, and finally the
+    ``rewrite_`` rules for the node's type in pipeline order (looked up in
+    a dispatch table built once per node type);
+  • when a rule changes the node, the result is normalised in place
+    before the traversal moves on, so a β-redex's body is folded in the
+    same walk that created it;
+  • change is tracked with a ``modified`` flag, comparing term ids of the
+    old and new node, rather than dumping the tree after each round;
+  • subtrees marked normal under the current pipeline version (see
+    ``mark_normal``) are not entered at all unless a pass reports it could
+    still rewrite them in this env (``SimplifyPass.rewrites_normal``).
+    Splicing already-simplified PhiValues into a new term therefore only
+    costs the new structure around the splice points;
+  • passes are dropped for any subtree whose node-type summary contains
+    none of their ``TARGETS``, so e.g. dict folding never walks a
+    denotation without dict displays;
+  • a subtree the walk has already normalised is not walked again when a
+    rule moves it (e.g. dropping the outer guard of ``φ % G % G`` yields
+    the already-normal ``φ % G``), so rewriting near the root of a long
+    chain does not re-walk the chain below it.
+
+The walk itself is iterative (``utils.rewrite_postorder``), so terms of
+any depth are rewritten without hitting the recursion limit.
+
+Passes that are not rule-based (they override ``visit``) split the
+pipeline into segments and run as ordinary walks between them.
+"""
+
+from __future__ import annotations
+
+import ast
+from typing import Iterable, Sequence
+
+from p4s.core.terms import term_id
+from .passes import SimplifyPass
+from .utils import rewrite_postorder, type_mask
+
+
+# attribute holding the pipeline version a subtree is known normal under
+NORMAL_MARK = "_normal_under"
+# attribute holding (rewriter token, active passes) for subtrees a running
+# FusedRewriter has normalised
+_SETTLED = "_fused_settled"
+
+
+def mark_normal(tree: ast.AST, version: int) -> None:
+  """Mark every subtree of *tree* (a converged result) as normal.
+
+  Marks are annotations like cached term ids: ``copy_node`` drops them,
+  so they only ever sit on nodes that have not changed since.  The same
+  walk does ``ast.fix_missing_locations`` for the new nodes, so neither
+  step revisits subtrees that were already marked.
+  """
+  if tree.__dict__.get(NORMAL_MARK) == version:
+    return
+  stack = [(tree, 1, 0, 1, 0)]
+  while stack:
+    node, lineno, col, end_lineno, end_col = stack.pop()
+    d = node.__dict__
+    if d.get(NORMAL_MARK) == version:
+      continue
+    if "lineno" in node._attributes:
+      if "lineno" not in d:
+        node.lineno = lineno
+      if "col_offset" not in d:
+        node.col_offset = col
+      if "end_lineno" not in d or node.end_lineno is None:
+        node.end_lineno = end_lineno
+      if "end_col_offset" not in d or node.end_col_offset is None:
+        node.end_col_offset = end_col
+      lineno, col = node.lineno, node.col_offset
+      end_lineno, end_col = node.end_lineno, node.end_col_offset
+    setattr(node, NORMAL_MARK, version)
+    for child in ast.iter_child_nodes(node):
+      stack.append((child, lineno, col, end_lineno, end_col))
+
+
+class FusedRewriter:
+  """Apply the rules of several rule-based passes in one traversal."""
+
+  def __init__(self,
+               passes: Sequence[SimplifyPass],
+               max_iter: int = 5,
+               normal: int | None = None):
+    self.passes = tuple(passes)
+    self.max_iter = max_iter
+    self.normal = normal
+    self.modified = False
+    self._rule_table: dict[str, tuple] = {}
+    self._enter_table: dict[str, tuple] = {}
+    self._active_table: dict[tuple[tuple, int], tuple] = {}
+    self._token = object()
+
+  # ------------------------------------------------------------------
+  #  dispatch tables (built lazily, once per node type)
+  # ------------------------------------------------------------------
+  def _rules_for(self, name: str) -> tuple:
+    rules = self._rule_table.get(name)
+    if rules is None:
+      rules = self._rule_table[name] = tuple(
+        (pos, p, p._rules[name])
+        for pos, p in enumerate(self.passes) if name in p._rules
+      )
+    return rules
+
+  def _targeting(self, active: tuple, mask: int) -> tuple:
+    """The passes in *active* that target a type in summary *mask*."""
+    key = (active, mask)
+    targeting = self._active_table.get(key)
+    if targeting is None:
+      targeting = tuple(p for p in active if p._target_mask & mask)
+      if targeting == active:
+        targeting = active
+      self._active_table[key] = targeting
+    return targeting
+
+  def _enters_for(self, name: str) -> tuple:
+    enters = self._enter_table.get(name)
+    if enters is None:
+      enters = self._enter_table[name] = tuple(
+        (p, p._enters[name], p._exits.get(name))
+        for p in self.passes if name in p._enters
+      )
+    return enters
+
+  # ------------------------------------------------------------------
+  #  traversal (see utils.rewrite_postorder; the walk context is the
+  #  tuple of passes still active for the subtree)
+  # ------------------------------------------------------------------
+  def rewrite(self, node: ast.AST) -> ast.AST:
+    return rewrite_postorder(node, self.passes, self._start, self._open, self._close)
+
+  def _settled(self, node: ast.AST, active: tuple) -> bool:
+    """Has this walk normalised *node* under (a superset of) *active*?"""
+    mark = node.__dict__.get(_SETTLED)
+    return (mark is not None and mark[0] is self._token
+            and (mark[1] is active or all(p in mark[1] for p in active)))
+
+  def _start(self, node: ast.AST, active: tuple) -> list | None:
+    active = self._targeting(active, type_mask(node))
+    if not active or self._settled(node, active):
+      return None
+    if (self.normal is not None
+        and node.__dict__.get(NORMAL_MARK) == self.normal
+        and not any(p.rewrites_normal(node) for p in active)):
+      return None
+    # [active, inner (after enter_ hooks), entered exit_ hooks, rewrites]
+    return [active, active, (), 0]
+
+  def _open(self, node: ast.AST, state: list) -> tuple | None:
+    name = type(node).__name__
+    inner = state[0]
+    entered = []
+    for p, enter, exit_ in self._enters_for(name):
+      if p not in inner:
+        continue
+      if enter(p, node) is False:
+        inner = tuple(q for q in inner if q is not p)
+      elif exit_ is not None:
+        entered.append((p, exit_))
+    state[1], state[2] = inner, entered
+    return inner or None
+
+  def _close(self, node: ast.AST, state: list) -> tuple[ast.AST, bool]:
+    _, inner, entered, rewrites = state
+    for p, exit_ in reversed(entered):
+      exit_(p, node)
+    new = self._apply(node, inner)
+    if new is node or term_id(new) == term_id(node):
+      setattr(new, _SETTLED, (self._token, state[0]))
+      return new, False
+    # the rules changed the node: normalise the result again, at most
+    # max_iter times at one position
+    self.modified = True
+    if self._settled(new, self._targeting(state[0], type_mask(new))):
+      return new, False
+    state[3] = rewrites = rewrites + 1
+    return new, rewrites < self.max_iter
+
+  def _apply(self, node: ast.AST, active: tuple) -> ast.AST:
+    everyone = active is self.passes
+    next_pos = 0
+    while True:
+      for pos, p, rule in self._rules_for(type(node).__name__):
+        if pos < next_pos or not (everyone or p in active):
+          continue
+        new = rule(p, node)
+        next_pos = pos + 1
+        if type(new) is not type(node):
+          node = new
+          break      # continue with the rules for the new node type
+        node = new
+      else:
+        return node
+
+
+def run_passes(pass_classes: Iterable[type[SimplifyPass]],
+               tree: ast.AST,
+               env,
+               max_iter: int = 5,
+               normal: int | None = None) -> tuple[ast.AST, bool]:
+  """One round of the pipeline over *tree*; returns ``(tree, modified)``.
+
+  *normal* is the pipeline version whose normal-form marks may be trusted.
+  """
+  modified = False
+  segment: list[SimplifyPass] = []
+
+  def flush(tree):
+    nonlocal modified
+    if segment:
+      rewriter = FusedRewriter(segment, max_iter, normal)
+      tree = rewriter.rewrite(tree)
+      modified = modified or rewriter.modified
+      segment.clear()
+    return tree
+
+  for cls in pass_classes:
+    if cls.fusable:
+      segment.append(cls(env))
+      continue
+    tree = flush(tree)
+    new = cls(env).visit(tree)
+    if new is not tree and term_id(new) != term_id(tree):
+      modified = True
+    tree = new
+  return flush(tree), modified
+
+
+# ---------------------------------------------------------------------------
+#  rudimentary tests
+# ---------------------------------------------------------------------------
+
+if __name__ == "__main__":
+  from . import simplify
+  from .passes import PASS_PIPELINE, pipeline_version
+  from .utils import copy_node, free_vars
+
+  def pass_by_pass(tree, env):
+    # reference: each pass as its own walk, to a fixed point
+    for _ in range(10):
+      before = term_id(tree)
+      for cls in PASS_PIPELINE:
+        tree = cls(env).visit(tree)
+      if term_id(tree) == before:
+        return tree
+    raise AssertionError("pass-by-pass run did not converge")
+
+  # one fused traversal agrees with running the passes one by one
+  for cls in PASS_PIPELINE:
+    env = getattr(cls, "TEST_ENV", {}) or {}
+    for src, _ in getattr(cls, "TESTS", ()):
+      tree = ast.parse(src, mode="eval").body
+      fused, modified = run_passes(PASS_PIPELINE, tree, env)
+      while modified:
+        fused, modified = run_passes(PASS_PIPELINE, fused, env)
+      assert ast.unparse(fused) == ast.unparse(pass_by_pass(tree, env)), src
+
+  # a converged result is marked normal and not rewritten again
+  out = simplify("(lambda x: P(x) and Q(x))(J) % G", env={})
+  assert out.__dict__.get(NORMAL_MARK) == pipeline_version()
+  rewriter = FusedRewriter([cls({}) for cls in PASS_PIPELINE if cls.fusable],
+                           normal=pipeline_version())
+  assert rewriter.rewrite(out) is out and not rewriter.modified
+
+  # a chain of guards and a long conjunction under a binder, both far
+  # deeper than the recursion limit, in one walk each
+  depth = 3000
+  node = ast.Name(id="a", ctx=ast.Load())
+  for i in range(depth):
+    node = ast.BinOp(left=node, op=ast.Mod(), right=ast.Name(id=f"g{i % 50}", ctx=ast.Load()))
+  node = simplify(node, env={})
+  guards = 0
+  while isinstance(node, ast.BinOp):
+    node, guards = node.left, guards + 1
+  assert guards == 50
+  x = ast.Name(id="x", ctx=ast.Load())
+  body = ast.Call(func=ast.Name(id="Q", ctx=ast.Load()), args=[x], keywords=[])
+  for i in range(depth):
+    atom = ast.Call(func=ast.Name(id=f"P{i}", ctx=ast.Load()), args=[x], keywords=[])
+    body = ast.BoolOp(op=ast.And(), values=[atom, body])
+  lam = ast.parse("lambda x: x", mode="eval").body
+  call = ast.Call(func=copy_node(lam, body=body), args=[ast.Name(id="J", ctx=ast.Load())], keywords=[])
+  out = simplify(call, env={})
+  assert "x" not in free_vars(out) and "J" in free_vars(out)
+  print("✅ fused rewriter sanity tests passed.")
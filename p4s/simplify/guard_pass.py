@@ -28,11 +28,36 @@ from __future__ import annotations
 import ast
 
 from p4s.core.constants import UNDEF   # sentinel for undefined values
+from p4s.core.terms import term_id     # hash-consed structural ids
 from .passes import SimplifyPass   # base class provides .env (ChainMap)
+from .utils import copy_node, free_vars
 
 # sentinel name for undefined
 UNDEF_NAME = str(UNDEF)
 
+def _is_guard(node: ast.AST) -> bool:
+  return isinstance(node, ast.BinOp) and isinstance(node.op, ast.Mod)
+
+
+def collect_guard_chain(node: ast.AST) -> tuple[ast.AST, list[ast.AST]]:
+  """Return (payload, guards) where guards are in application order.
+
+  A chain ``a % g1 % … % gN`` is a left-nested tree of ``%`` nodes whose
+  right operands may themselves be chains; flattening it left to right
+  gives the payload followed by the guards.  Iterative, so chains of any
+  length are fine.
+  """
+  atoms: list[ast.AST] = []
+  stack = [node]
+  while stack:
+    current = stack.pop()
+    if _is_guard(current):
+      stack.append(current.right)
+      stack.append(current.left)
+    else:
+      atoms.append(current)
+  return atoms[0], atoms[1:]
+
 # ---------------------------------------------------------------------------
 # GuardFolder pass
 # ---------------------------------------------------------------------------
@@ -40,6 +65,8 @@ UNDEF_NAME = str(UNDEF)
 class GuardFolder(SimplifyPass):
   """Fold `%`‑guard AST patterns into canonical forms (Option 1)."""
 
+  # `%` guards, plus calls for defined(...)
+  TARGETS = (ast.Mod, ast.Call)
   TESTS = [
     ("phi % False", UNDEF_NAME),
     ("phi % True", "phi"),
@@ -105,6 +132,12 @@ class GuardFolder(SimplifyPass):
       case _:
         return None
 
+  def rewrites_normal(self, node: ast.AST) -> bool:
+    # env is only read for the static definedness of defined(...)'s
+    # argument, which may differ here for a name env binds
+    names = free_vars(node)
+    return "defined" in names and any(name in self.env for name in names)
+
   def _is_assumed_defined_name(self, name: str) -> bool | None:
     """Return static definedness for bare names under the lexical assumptions."""
     if name == UNDEF_NAME:
@@ -160,17 +193,7 @@ class GuardFolder(SimplifyPass):
       case _:
         return None
 
-  @staticmethod
-  def _collect_guard_chain(node: ast.AST) -> tuple[ast.AST, list[ast.AST]]:
-    """Return (payload, guards) where guards are in application order."""
-    if not isinstance(node, ast.BinOp) or not isinstance(node.op, ast.Mod):
-      return node, []
-
-    payload, guards = GuardFolder._collect_guard_chain(node.left)
-    rhs_payload, rhs_guards = GuardFolder._collect_guard_chain(node.right)
-    guards.append(rhs_payload)
-    guards.extend(rhs_guards)
-    return payload, guards
+  _collect_guard_chain = staticmethod(collect_guard_chain)
 
   @staticmethod
   def _rebuild_guard_chain(payload: ast.AST, guards: list[ast.AST]) -> ast.AST:
@@ -180,9 +203,7 @@ class GuardFolder(SimplifyPass):
     return out
 
   # ---------- φ % ψ  ------------------------------------------------
-  def visit_BinOp(self, node: ast.BinOp) -> ast.AST:
-    self.generic_visit(node)
-
+  def rewrite_BinOp(self, node: ast.BinOp) -> ast.AST:
     match node:
       # φ % False  -> UNDEF
       case ast.BinOp(op=ast.Mod(), right=ast.Constant(value=False)):
@@ -203,8 +224,7 @@ class GuardFolder(SimplifyPass):
     return node
 
   # ---------- (φ % ψ) is not UNDEF  →  ψ ---------------------------
-  def visit_Compare(self, node: ast.Compare) -> ast.AST:
-    self.generic_visit(node)
+  def rewrite_Compare(self, node: ast.Compare) -> ast.AST:
     match node:
       case ast.Compare(
         left=ast.BinOp(left=_, op=ast.Mod(), right=rhs),
@@ -215,9 +235,7 @@ class GuardFolder(SimplifyPass):
     return node
 
   # ---------- defined(φ % ψ)  →  ψ ---------------------------------
-  def visit_BoolOp(self, node: ast.BoolOp) -> ast.AST:
-    self.generic_visit(node)
-
+  def rewrite_BoolOp(self, node: ast.BoolOp) -> ast.AST:
     # Hoist guards from top-level conjunction terms so duplicate guard
     # elimination can see and collapse repeated guards.
     #
@@ -248,14 +266,8 @@ class GuardFolder(SimplifyPass):
       out = ast.BinOp(left=out, op=ast.Mod(), right=guard)
     return out
 
-  def visit_Lambda(self, node: ast.Lambda) -> ast.AST:
-    self.generic_visit(node)
-    return node
-
   # ---------- call rewrites and defined(...) folding ---------------
-  def visit_Call(self, node: ast.Call) -> ast.AST:
-    self.generic_visit(node)
-
+  def rewrite_Call(self, node: ast.Call) -> ast.AST:
     match node:
       case ast.Call(
         func=ast.Name(id="defined", ctx=ast.Load()),
@@ -278,8 +290,7 @@ class GuardFolder(SimplifyPass):
       case ast.Call(
         func=ast.BinOp(left=lhs, op=ast.Mod(), right=rhs)
       ):
-        node.func = lhs
-        return ast.BinOp(left=node, op=ast.Mod(), right=rhs)
+        return ast.BinOp(left=copy_node(node, func=lhs), op=ast.Mod(), right=rhs)
 
     guards: list[ast.AST] = []
     new_args: list[ast.AST] = []
@@ -321,14 +332,15 @@ class GuardFolder(SimplifyPass):
 # Remove Duplicate Guard Pass
 # ---------------------------------------------------------------------------
 
-def guard_key(node: ast.AST) -> str:
+def guard_key(node: ast.AST) -> int:
   """
   Return a hashable, location-independent representation of *node*.
 
-  We rely on ast.dump(), suppressing lineno/col_offset etc.,
-  which is deterministic from 3.8 onward.
+  This is the node's hash-consed term id, so two guards are duplicates
+  exactly when their keys are equal.  Ids are cached on the nodes, so
+  re-keying the guards of a chain at every `%` node is O(1) per guard.
   """
-  return ast.dump(node, annotate_fields=True, include_attributes=False)
+  return term_id(node)
 
 class RemoveDuplicateGuards(SimplifyPass):
   """
@@ -339,24 +351,15 @@ class RemoveDuplicateGuards(SimplifyPass):
     (A % G1 % G2) % G1 → A % G1 % G2
   """
 
+  TARGETS = (ast.Mod,)
   TESTS = [
     ("(A % G) % G", "A % G"),
     ("A % (G1 % G2)", "A % G1 % G2"),
     ("(A % G1) % (G2 % G1)", "A % G1 % G2"),
   ]
 
-  def _collect_chain(self, node: ast.AST) -> tuple[ast.AST, list[ast.AST]]:
-    """Return (payload, guards) where guards are in application order."""
-    if not isinstance(node, ast.BinOp) or not isinstance(node.op, ast.Mod):
-      return node, []
-
-    payload, guards = self._collect_chain(node.left)
-    rhs_payload, rhs_guards = self._collect_chain(node.right)
-
-    # right can itself be a guard-chain produced by earlier rewrites
-    guards.append(rhs_payload)
-    guards.extend(rhs_guards)
-    return payload, guards
+  # the right operand can itself be a guard chain produced by earlier rewrites
+  _collect_chain = staticmethod(collect_guard_chain)
 
   @staticmethod
   def _rebuild_chain(payload: ast.AST, guards: list[ast.AST]) -> ast.AST:
@@ -366,15 +369,22 @@ class RemoveDuplicateGuards(SimplifyPass):
     return out
 
   # ---------- core visitor ------------------------------------------
-  def visit_BinOp(self, node: ast.BinOp):
-    node = self.generic_visit(node)
-
+  def rewrite_BinOp(self, node: ast.BinOp):
     if not (isinstance(node, ast.BinOp) and isinstance(node.op, ast.Mod)):
       return node
 
+    if not _is_guard(node.right):
+      # Common case, bottom-up on a left-nested chain: if the chain below
+      # is already duplicate-free, the only candidate is the new guard, and
+      # the result is either this node or the chain below it.
+      _, below = self._collect_chain(node.left)
+      keys = {guard_key(guard) for guard in below}
+      if len(keys) == len(below):
+        return node.left if guard_key(node.right) in keys else node
+
     payload, guards = self._collect_chain(node)
 
-    seen: set[str] = set()
+    seen: set[int] = set()
     unique_guards: list[ast.AST] = []
     for guard in guards:
       key = guard_key(guard)
@@ -383,4 +393,6 @@ class RemoveDuplicateGuards(SimplifyPass):
       seen.add(key)
       unique_guards.append(guard)
 
-    return self._rebuild_chain(payload, unique_guards)
\ No newline at end of file
+    out = self._rebuild_chain(payload, unique_guards)
+    # keep the original node (and its annotations) when already canonical
+    return node if term_id(out) == term_id(node) else out
\ No newline at end of file
@@ -9,29 +9,14 @@ from __future__ import annotations
 
 from ast import *
 from typing import Dict, Set
-from copy import deepcopy
 
 from .passes import SimplifyPass  # base class
+from .utils import CopyOnWriteTransformer, copy_node, free_vars, rewrite_postorder
 
 # ---------------------------------------------------------------------------
 # Helpers
 # ---------------------------------------------------------------------------
 
-def free_vars(node: AST) -> Set[str]:
-  """Collect free variable names inside *node*."""
-  match node:
-    case Name(id=name, ctx=Load()):
-      return {name}
-    case Lambda(args=args, body=body):
-      bound = {a.arg for a in args.args}
-      return free_vars(body) - bound
-    case _:
-      out: Set[str] = set()
-      for child in iter_child_nodes(node):
-        out.update(free_vars(child))
-      return out
-
-
 def _fresh(base: str, taken: Set[str]) -> str:
   """Generate a fresh identifier not in *taken*, based on *base*."""
   if base not in taken:
@@ -60,10 +45,24 @@ def _fresh(base: str, taken: Set[str]) -> str:
     candidate = f"{base}_{i}"
   return candidate
 
+def _carry_annotations(result: AST, call: Call) -> AST:
+  """Move *call*'s ``stype``/``guard`` onto *result*.
+
+  *result* may be shared with the lambda body or an argument, so we
+  annotate a shallow copy rather than the node itself.
+  """
+  carried = {k: v for k, v in vars(call).items() if k in ("stype", "guard")}
+  if not carried:
+    return result
+  result = copy_node(result)
+  for attr, value in carried.items():
+    setattr(result, attr, value)
+  return result
+
 # ---------------------------------------------------------------------------
 # Name substitution with built‑in α‑conversion
 # ---------------------------------------------------------------------------
-class _NameSubstituter(NodeTransformer):
+class _NameSubstituter(CopyOnWriteTransformer):
   """
   Replace each occurrence of the names in *mapping* with the
   corresponding AST node **while** performing capture‑avoidance.
@@ -72,6 +71,9 @@ class _NameSubstituter(NodeTransformer):
   collides with a name we would otherwise substitute or appears free in a
   replacement expression, we α‑rename that parameter to a fresh identifier
   and update the body accordingly.
+
+  Substitution is copy-on-write: replacement ASTs are shared rather than
+  copied, and only nodes on the path to a substituted name are rebuilt.
   """
   def __init__(self, mapping: Dict[str, AST]):
     super().__init__()
@@ -83,13 +85,15 @@ class _NameSubstituter(NodeTransformer):
     # Shadowed keys are dropped from the mapping when we recurse, so their
     # replacement values will never be introduced inside — no capture possible.
     active_mapping = {k: v for k, v in self.mapping.items() if k not in bound}
+    if active_mapping.keys().isdisjoint(free_vars(node.body)):
+      return node
     replacement_free = set().union(*(free_vars(v) for v in active_mapping.values()))
     collisions = bound & replacement_free
 
     if not collisions:
       # No renaming needed; just recurse with the active (non-shadowed) mapping
-      node.body = _NameSubstituter(active_mapping).visit(node.body)
-      return node
+      body = _NameSubstituter(active_mapping).visit(node.body)
+      return node if body is node.body else copy_node(node, body=body)
 
     # α‑rename colliding parameters
     taken = bound | free_vars(node.body) | set(self.mapping.keys())
@@ -100,26 +104,39 @@ class _NameSubstituter(NodeTransformer):
       taken.add(new_name)
 
     # Apply renaming to parameters
-    for arg in node.args.args:
-      if arg.arg in rename_map:
-        arg.arg = rename_map[arg.arg]
+    args = copy_node(node.args, args=[
+      copy_node(arg, arg=rename_map[arg.arg]) if arg.arg in rename_map else arg
+      for arg in node.args.args
+    ])
 
     # Substitute old param references inside body
     param_subst = {old: Name(id=new, ctx=Load()) for old, new in rename_map.items()}
-    node.body = _NameSubstituter(param_subst).visit(node.body)
+    body = _NameSubstituter(param_subst).visit(node.body)
 
     # Recurse on active mapping (all bound vars already excluded)
-    node.body = _NameSubstituter(active_mapping).visit(node.body)
-    return node
-
-  def visit_Lambda(self, node: Lambda) -> Lambda:
-    # Deep-copy to avoid mutating original AST
-    return self._alpha_and_recurse(deepcopy(node))
-
-  def visit_Name(self, node: Name) -> AST:
-    if isinstance(node.ctx, Load) and node.id in self.mapping:
-      return deepcopy(self.mapping[node.id])
-    return node
+    body = _NameSubstituter(active_mapping).visit(body)
+    return copy_node(node, args=args, body=body)
+
+  def visit(self, node: AST) -> AST:
+    return rewrite_postorder(node, self.mapping, self._start, self._open, self._close)
+
+  # walk callbacks (see utils.rewrite_postorder); the state is () for a
+  # node whose children are walked, or (replacement,)
+  def _start(self, node: AST, mapping) -> tuple | None:
+    # Nothing to substitute below a node none of whose free names is mapped.
+    if mapping.keys().isdisjoint(free_vars(node)):
+      return None
+    if isinstance(node, Lambda):
+      return (self._alpha_and_recurse(node),)
+    if isinstance(node, Name):
+      return (mapping[node.id],)
+    return ()
+
+  def _open(self, node: AST, state: tuple):
+    return None if state else self.mapping
+
+  def _close(self, node: AST, state: tuple) -> tuple[AST, bool]:
+    return (state[0] if state else node), False
 
 # ---------------------------------------------------------------------------
 # Beta‑reducer pass
@@ -132,6 +149,7 @@ class BetaReducer(SimplifyPass):
   overrides.
   """
 
+  TARGETS = (Call,)
   TESTS = [
     # positional + keyword on lambda
     ("(lambda x, y: x * y)(2, y=5)",               "2 * 5"),
@@ -152,12 +170,9 @@ class BetaReducer(SimplifyPass):
   ]
 
   # ------------------------------------------------------------------
-  # main visitor
+  # main rule
   # ------------------------------------------------------------------
-  def visit_Call(self, node: Call) -> AST:
-    # First recurse into children
-    self.generic_visit(node)
-
+  def rewrite_Call(self, node: Call) -> AST:
     # Fast‑path: no keyword args → original positional‑only logic
     if not node.keywords:
       return self._inline_lambda_positional_only(node)
@@ -196,14 +211,9 @@ class BetaReducer(SimplifyPass):
       # Unified substitution map: parameters + extra keyword env
       subst_map = param_bindings | {k: v for k, v in kw_bindings.items() if k not in params}
 
-      body_copy = deepcopy(lam.body)
-      new_body = _NameSubstituter(subst_map).visit(body_copy)
+      new_body = _NameSubstituter(subst_map).visit(lam.body)
       # Preserve type annotation from the Call node
-      if hasattr(node, 'stype'):
-        new_body.stype = node.stype
-      if hasattr(node, 'guard'):
-        new_body.guard = node.guard
-      return new_body
+      return _carry_annotations(new_body, node)
 
     # ------------------------------------------------------------------
     # CASE 2 : arbitrary callable (e.g. LOVES(Mary,a)(a=John))
@@ -212,14 +222,9 @@ class BetaReducer(SimplifyPass):
     if node.args:
       return node  # positional args present → leave untouched
 
-    func_copy = deepcopy(node.func)
-    func_copy = _NameSubstituter(kw_bindings).visit(func_copy)
+    new_func = _NameSubstituter(kw_bindings).visit(node.func)
     # Preserve type annotation from the Call node
-    if hasattr(node, 'stype'):
-      func_copy.stype = node.stype
-    if hasattr(node, 'guard'):
-      func_copy.guard = node.guard
-    return func_copy
+    return _carry_annotations(new_func, node)
   
   # ------------------------------------------------------------------
   # helper: original positional‑only lambda inliner (unchanged)
@@ -233,12 +238,7 @@ class BetaReducer(SimplifyPass):
     if len(params) != len(node.args):
       return node
 
-    lam_copy = deepcopy(lam)
     subst_map = dict(zip(params, node.args))
-    result = _NameSubstituter(subst_map).visit(lam_copy.body)
+    result = _NameSubstituter(subst_map).visit(lam.body)
     # Preserve type annotation from the Call node
-    if hasattr(node, 'stype'):
-      result.stype = node.stype
-    if hasattr(node, 'guard'):
-      result.guard = node.guard
-    return result
\ No newline at end of file
+    return _carry_annotations(result, node)
\ No newline at end of file
@@ -1,40 +1,167 @@
 # phosphorus/simplify/macro_pass.py
-"""MacroExpander: inlines function/method calls whose *parameters* are
-annotated with ``ast.AST``.  Any argument corresponding to such a
-parameter is passed *as the raw AST*; all other arguments are evaluated
-in the current environment.  The call is replaced by the AST returned by
-that function (if it returns an AST)."""
+"""MacroExpander: inlines calls to registered macros -- functions whose
+*parameters* are annotated with ``ast.AST``.  Any argument corresponding
+to such a parameter is passed *as the raw AST*; all other arguments are
+evaluated in the current environment.  The call is replaced by the AST
+returned by that function (if it returns an AST).
+
+Macros are registered once, with the ``@macro`` decorator or
+``MACROS.scan(namespace)``, or else the first time a call to them is
+looked up; their signature data is cached then.  A call with a dotted
+head (``mod.f(...)``) whose last name is not a registered macro's name is
+rejected without evaluating anything."""
 from __future__ import annotations
 
 import ast
+import builtins
 import inspect
-from typing import Dict, List, Any, get_type_hints
+import weakref
+from dataclasses import dataclass
+from typing import Dict, List, Any, Callable, get_type_hints
 
 from .passes import SimplifyPass  # base class provides env
+from .utils  import free_vars, type_bit, type_mask
 
 # ---------------------------------------------------------------------------
 # Helper: evaluate an expression AST under a given env (globals+locals)
 # ---------------------------------------------------------------------------
 
+_EVAL_GLOBALS = {"__builtins__": builtins}
+
 def _eval_ast(expr: ast.AST, env: Dict[str, Any]) -> Any:
-  """Safely evaluate *expr* in *env* (LEGB ChainMap)."""
+  """Safely evaluate *expr* in *env* (LEGB ChainMap).
+
+  *env* is passed as the locals mapping, so any mapping works, not only a
+  real dict.
+  """
+  if isinstance(expr, ast.Constant):
+    return expr.value
   code = compile(ast.Expression(expr), filename="<ast>", mode="eval")
-  return eval(code, env)
+  return eval(code, _EVAL_GLOBALS, env)
+
+# ---------------------------------------------------------------------------
+# Macro registry
+# ---------------------------------------------------------------------------
+
+@dataclass(frozen=True, slots=True)
+class MacroInfo:
+  """Signature data for a registered macro, computed once."""
+  fn: Callable
+  signature: inspect.Signature
+  ast_params: frozenset[str]       # parameters that receive raw ASTs
+
+
+class MacroRegistry:
+  """Functions that MacroExpander may expand, keyed by function object.
 
+  Registration inspects the signature and type hints once; expansion
+  looks them up here.  A function that was never registered but has an
+  ``ast.AST``-annotated parameter is registered the first time it is
+  looked up (see :meth:`get`); functions found not to be macros are
+  remembered, weakly, so each is inspected only once.
+  """
+
+  def __init__(self) -> None:
+    self._infos: dict[Callable, MacroInfo] = {}
+    self._names: dict[str, int] = {}     # __name__ -> number registered
+    self._plain: weakref.WeakSet = weakref.WeakSet()  # inspected, not macros
+
+  def register(self, fn: Callable) -> Callable:
+    """Register *fn* as a macro (usable as a decorator) and return it."""
+    if fn in self._infos:
+      return fn
+    try:
+      hints = get_type_hints(fn)
+    except Exception:
+      hints = {}
+    sig = inspect.signature(fn)
+    ast_params = frozenset(name for name in sig.parameters if hints.get(name) is ast.AST)
+    self._infos[fn] = MacroInfo(fn, sig, ast_params)
+    self._plain.discard(fn)
+    name = fn.__name__
+    self._names[name] = self._names.get(name, 0) + 1
+    return fn
+
+  def unregister(self, fn: Callable) -> None:
+    if self._infos.pop(fn, None) is None:
+      return
+    self._plain.add(fn)                # and do not register it lazily again
+    name = fn.__name__
+    self._names[name] -= 1
+    if not self._names[name]:
+      del self._names[name]
+
+  @staticmethod
+  def _is_annotated(fn: Any) -> bool:
+    """Is *fn* a function with an ``ast.AST``-annotated parameter?"""
+    if not getattr(fn, "__annotations__", None):
+      return False
+    try:
+      hints = get_type_hints(fn)
+    except Exception:
+      return False
+    return any(hint is ast.AST for key, hint in hints.items() if key != "return")
+
+  def scan(self, namespace: Dict[str, Any]) -> list[Callable]:
+    """Register every function in *namespace* with an ``ast.AST``-annotated
+    parameter; returns the functions registered."""
+    found = []
+    for value in list(namespace.values()):
+      if not inspect.isfunction(value) or value in self._infos:
+        continue
+      if self._is_annotated(value):
+        found.append(self.register(value))
+    return found
+
+  def may_name(self, name: str) -> bool:
+    """Could a callable called *name* be a registered macro?"""
+    return name in self._names
+
+  def get(self, fn: Any) -> MacroInfo | None:
+    """Macro data for *fn*, registering it now if it is annotated as one."""
+    try:
+      info = self._infos.get(fn)
+    except TypeError:  # unhashable callee
+      return None
+    if info is not None or not inspect.isfunction(fn) or fn in self._plain:
+      return info
+    if self._is_annotated(fn):
+      self.register(fn)
+      return self._infos[fn]
+    self._plain.add(fn)
+    return None
 
+  def __contains__(self, fn: Any) -> bool:
+    return self.get(fn) is not None
+
+  def __len__(self) -> int:
+    return len(self._infos)
+
+
+# process-wide registry; @macro registers into it
+MACROS = MacroRegistry()
+macro = MACROS.register
+
+
+@macro
 def macro_add(l: ast.AST, r: Any) -> ast.AST:
   """Example macro: add literal 'r' to AST 'l'."""
   return ast.BinOp(left=l, op=ast.Add(), right=ast.Constant(value=r))
 
+@macro
 def macro_chain(*elts: ast.AST) -> ast.AST:
   """Build a tuple AST from any number of AST arguments."""
   return ast.Tuple(elts=list(elts), ctx=ast.Load())
 
+def macro_swap(pair: ast.AST) -> ast.AST:
+  """Example unregistered macro: its annotation registers it on first use."""
+  return ast.Tuple(elts=pair.elts[::-1], ctx=ast.Load())
+
 # ---------------------------------------------------------------------------
 # MacroExpander pass
 # ---------------------------------------------------------------------------
 class MacroExpander(SimplifyPass):
-  """Inline calls whose parameters are annotated with ``: AST``.
+  """Inline calls to registered macros (see ``MacroRegistry``).
 
   * For each parameter annotated with ``ast.AST`` we pass the original
     argument *AST* (un-evaluated).
@@ -44,66 +171,75 @@ class MacroExpander(SimplifyPass):
     that AST back into the tree; otherwise we leave the call intact.
   """
 
+  TARGETS = (ast.Call,)
   TESTS = [
     ("macro_add(x, 3)",  "x + 3"),
     ("macro_chain(a, b, c)",  "(a, b, c)"),
+    ("macro_swap((a, b))",  "(b, a)"),
   ]
-  TEST_ENV = { 'macro_add': macro_add, 'macro_chain': macro_chain }
-
-  def visit_Call(self, node: ast.Call) -> ast.AST:
-    self.generic_visit(node)
-
+  TEST_ENV = { 'macro_add': macro_add, 'macro_chain': macro_chain, 'macro_swap': macro_swap }
+
+  def rewrites_normal(self, node: ast.AST) -> bool:
+    # a call expands only if env binds its head to a macro
+    if not self._target_mask & type_mask(node):
+      return False
+    if type_mask(node) & type_bit(ast.Attribute):
+      return True                     # dotted heads: not worth resolving here
+    return any(MACROS.get(self.env.get(name)) is not None
+               for name in free_vars(node))
+
+  def _resolve_macro(self, func: ast.AST) -> MacroInfo | None:
+    """Macro named by *func* (a Name or attribute chain), if any."""
+    if isinstance(func, ast.Name):
+      return MACROS.get(self.env.get(func.id))
+    if not isinstance(func, ast.Attribute) or not MACROS.may_name(func.attr):
+      return None
     try:
-      func_obj = _eval_ast(node.func, self.env)
+      obj = _eval_ast(func, self.env)
     except Exception:
-      return node
+      return None
+    return MACROS.get(obj)
 
-    sig = inspect.signature(func_obj)
-    hints = {}
-    try:
-      hints = get_type_hints(func_obj)
-    except Exception:
-      pass
+  def rewrite_Call(self, node: ast.Call) -> ast.AST:
+    info = self._resolve_macro(node.func)
+    if info is None:
+      return node
 
+    sig = info.signature
     params = list(sig.parameters.values())
 
-    # Build positional argument list, sending raw AST for AST-annotated params
-    pos_args: List[Any] = []
-    arg_iter = iter(node.args)
-    for p in params:
-      ann = hints.get(p.name)
-      if p.kind in (inspect.Parameter.POSITIONAL_ONLY,
-                    inspect.Parameter.POSITIONAL_OR_KEYWORD):
-        try:
-          arg_ast = next(arg_iter)
-        except StopIteration:
+    try:
+      # Build positional argument list, sending raw AST for AST-annotated params
+      pos_args: List[Any] = []
+      arg_iter = iter(node.args)
+      for p in params:
+        raw = p.name in info.ast_params
+        if p.kind in (inspect.Parameter.POSITIONAL_ONLY,
+                      inspect.Parameter.POSITIONAL_OR_KEYWORD):
+          try:
+            arg_ast = next(arg_iter)
+          except StopIteration:
+            break
+          pos_args.append(arg_ast if raw else _eval_ast(arg_ast, self.env))
+        elif p.kind is inspect.Parameter.VAR_POSITIONAL:
+          rest = list(arg_iter)
+          if raw:
+            pos_args.extend(rest)
+          else:
+            pos_args.extend(_eval_ast(a, self.env) for a in rest)
           break
-        if ann is ast.AST:
-          pos_args.append(arg_ast)
-        else:
-          pos_args.append(_eval_ast(arg_ast, self.env))
-      elif p.kind is inspect.Parameter.VAR_POSITIONAL:
-        rest = list(arg_iter)
-        if ann is ast.AST:
-          pos_args.extend(rest)
+
+      # Build keyword arguments
+      kw_args: Dict[str, Any] = {}
+      for kw in node.keywords:
+        if kw.arg is None:
+          return node
+        if kw.arg in sig.parameters and kw.arg in info.ast_params:
+          kw_args[kw.arg] = kw.value
         else:
-          pos_args.extend(_eval_ast(a, self.env) for a in rest)
-        break
-
-    # Build keyword arguments
-    kw_args: Dict[str, Any] = {}
-    for kw in node.keywords:
-      if kw.arg is None:
-        return node
-      param = sig.parameters.get(kw.arg)
-      ann = hints.get(kw.arg)
-      if param and ann is ast.AST:
-        kw_args[kw.arg] = kw.value
-      else:
-        kw_args[kw.arg] = _eval_ast(kw.value, self.env)
+          kw_args[kw.arg] = _eval_ast(kw.value, self.env)
 
-    try:
-      result = func_obj(*pos_args, **kw_args)
+      result = info.fn(*pos_args, **kw_args)
     except Exception:
       return node
 
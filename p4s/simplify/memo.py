@@ -0,0 +1,256 @@
+# phosphorus/simplify/memo.py
+"""
+Opt-in memo layer for ``simplify()``.
+
+A normal form depends on two things: the input term and whatever the
+passes looked up in ``env`` while rewriting it.  The memo therefore keys
+each result on
+
+  • the interned term id of the input, plus the ``stype``/``guard``
+    annotations on its nodes (which term ids ignore, but the passes carry
+    into the result),
+  • the pipeline configuration, and
+  • a fingerprint of *only* the env bindings that were consulted.
+
+Lookups first find the dependency "shapes" (tuples of consulted names)
+recorded for the input, fingerprint those names in the current env, and
+probe an LRU table.  Re-interpreting the same sentences therefore hits
+even though every PhiValue is built in a fresh environment.
+
+Enable globally with ``SIMPLIFY_MEMO.enable()`` or per call with
+``simplify(expr, memo=True)``.
+"""
+from __future__ import annotations
+
+import ast
+from collections import ChainMap
+from typing import Any, Callable, Hashable
+
+from p4s.core.cache import CacheInfo, LRUCache
+from p4s.core.terms import term_id
+from .utils import is_literal
+
+# marker for "name was looked up but is not bound"
+_ABSENT = object()
+
+
+def _fingerprint(value: Any) -> Hashable:
+  """Hashable summary of an env binding, as far as the passes can tell."""
+  if value is _ABSENT:
+    return _ABSENT
+  expr = getattr(value, "expr", None)
+  if isinstance(expr, ast.AST):
+    guard = getattr(value, "guard", None)
+    return ("expr",
+            getattr(value, "_key", None) or term_id(expr),
+            getattr(value, "stype", None),
+            None if guard is None else term_id(guard))
+  if is_literal(value):
+    return ("literal", type(value), repr(value))
+  # Anything else is opaque to the passes: compare by identity.  The memo
+  # entry keeps the value alive, so the id cannot be recycled.
+  return ("object", id(value))
+
+
+def _annotations(expr: ast.AST) -> Hashable:
+  """The ``stype``/``guard`` annotations on *expr*'s nodes, by position."""
+  found = []
+  for i, node in enumerate(ast.walk(expr)):
+    fields = node.__dict__
+    stype, guard = fields.get("stype"), fields.get("guard")
+    if stype is not None or guard is not None:
+      found.append((i, stype, None if guard is None else term_id(guard)))
+  return tuple(found)
+
+
+def _resolve(env, name: str) -> Any:
+  try:
+    return env[name] if name in env else _ABSENT
+  except KeyError:
+    return _ABSENT
+
+
+class _RecordingChainMap(ChainMap):
+  """ChainMap view over *env* that remembers every name looked up."""
+
+  def __init__(self, env):
+    super().__init__(env)
+    self.consulted: dict[str, Any] = {}
+
+  def __getitem__(self, key):
+    try:
+      value = super().__getitem__(key)
+    except KeyError:
+      self.consulted.setdefault(key, _ABSENT)
+      raise
+    self.consulted.setdefault(key, value)
+    return value
+
+  def __contains__(self, key):
+    found = super().__contains__(key)
+    if key not in self.consulted:
+      self.consulted[key] = super().__getitem__(key) if found else _ABSENT
+    return found
+
+
+class _RecordingDict(dict):
+  """Dict copy of *env* that remembers every name looked up.
+
+  Used when the caller passed a real dict, so code paths that require
+  one (``eval`` globals) behave exactly as without the memo.
+  """
+
+  def __init__(self, env):
+    super().__init__(env)
+    self.consulted: dict[str, Any] = {}
+
+  def __getitem__(self, key):
+    try:
+      value = super().__getitem__(key)
+    except KeyError:
+      self.consulted.setdefault(key, _ABSENT)
+      raise
+    self.consulted.setdefault(key, value)
+    return value
+
+  def __contains__(self, key):
+    found = super().__contains__(key)
+    if key not in self.consulted:
+      self.consulted[key] = super().__getitem__(key) if found else _ABSENT
+    return found
+
+  def get(self, key, default=None):
+    return self[key] if key in self else default
+
+
+class SimplifyMemo:
+  """LRU memo of normal forms keyed on input term + consulted env bindings."""
+
+  # distinct dependency shapes remembered per input term
+  MAX_SHAPES = 8
+
+  def __init__(self, maxsize: int | None = 4096) -> None:
+    self.enabled = False
+    self._results = LRUCache(maxsize)
+    self._shapes: dict[Hashable, list[tuple[str, ...]]] = {}
+    self.hits = 0
+    self.misses = 0
+
+  # ------------------------------------------------------------------
+  #  configuration
+  # ------------------------------------------------------------------
+
+  def enable(self, maxsize: int | None = None) -> None:
+    self.enabled = True
+    if maxsize is not None:
+      self._results.resize(maxsize)
+
+  def disable(self) -> None:
+    self.enabled = False
+
+  def info(self) -> CacheInfo:
+    return CacheInfo(self.hits, self.misses, self._results.maxsize, len(self._results))
+
+  def invalidate(self, name: str | None = None) -> None:
+    """Forget everything, or only results that consulted *name*."""
+    if name is None:
+      self._results.clear()
+      self._shapes.clear()
+      self.hits = self.misses = 0
+      return
+    for key in self._results.keys():
+      if name in key[1]:
+        self._results.pop(key)
+    for key, shapes in list(self._shapes.items()):
+      kept = [names for names in shapes if name not in names]
+      if kept:
+        self._shapes[key] = kept
+      else:
+        del self._shapes[key]
+
+  # ------------------------------------------------------------------
+  #  memoised simplification
+  # ------------------------------------------------------------------
+
+  def simplify(self,
+               expr: ast.AST,
+               env,
+               config: Hashable,
+               run: Callable[[ast.AST, Any], ast.AST]) -> ast.AST:
+    """Return the memoised normal form of *expr*, computing it with *run*."""
+    key = (term_id(expr), _annotations(expr), config)
+
+    for names in self._shapes.get(key, ()):
+      fps = tuple(_fingerprint(_resolve(env, n)) for n in names)
+      entry = self._results.peek((key, names, fps))
+      if entry is not None:
+        self.hits += 1
+        return entry[0]
+    self.misses += 1
+
+    recorder = _RecordingDict(env) if type(env) is dict else _RecordingChainMap(env)
+    result = run(expr, recorder)
+
+    names = tuple(sorted(recorder.consulted))
+    values = tuple(recorder.consulted[n] for n in names)
+    fps = tuple(_fingerprint(v) for v in values)
+    # keep consulted values alive alongside the result (see _fingerprint),
+    # and the input, so its term id stays interned
+    self._results.put((key, names, fps), (result, values, expr))
+    shapes = self._shapes.setdefault(key, [])
+    if names in shapes:
+      shapes.remove(names)
+    shapes.insert(0, names)
+    del shapes[self.MAX_SHAPES:]
+    return result
+
+
+# process-wide memo used by simplify(); disabled by default
+SIMPLIFY_MEMO = SimplifyMemo()
+
+
+# ---------------------------------------------------------------------------
+#  rudimentary tests
+# ---------------------------------------------------------------------------
+
+if __name__ == "__main__":
+  calls = []
+
+  def run(expr, env):
+    # stands in for the pass pipeline: consults f, and g only when f is 0
+    calls.append(ast.unparse(expr))
+    return ast.Constant(env["f"] or env.get("g"))
+
+  memo = SimplifyMemo(maxsize=16)
+  expr = ast.parse("f(x)", mode="eval").body
+  env = {"f": 1, "g": 2, "h": 3}
+  first = memo.simplify(expr, env, "cfg", run)
+  # same structure in a fresh env with equal bindings: a hit
+  again = memo.simplify(ast.parse("f(x)", mode="eval").body, dict(env), "cfg", run)
+  assert again is first and len(calls) == 1 and memo.info().hits == 1
+  # names the run never consulted do not matter
+  assert memo.simplify(expr, {**env, "h": 30, "g": 20}, "cfg", run) is first
+  assert len(calls) == 1
+  # rebinding a consulted name, or another config, misses
+  assert memo.simplify(expr, ChainMap({"f": 5}, env), "cfg", run).value == 5
+  assert memo.simplify(expr, env, "other", run) is not first and len(calls) == 3
+  # a second dependency shape for the same input
+  assert memo.simplify(expr, {**env, "f": 0}, "cfg", run).value == 2
+  assert memo.simplify(expr, {**env, "f": 0}, "cfg", run).value == 2
+  assert len(calls) == 4
+  # invalidating a name drops only the results that consulted it
+  memo.invalidate("g")
+  assert memo.simplify(expr, env, "cfg", run) is first
+  memo.simplify(expr, {**env, "f": 0}, "cfg", run)
+  assert len(calls) == 5
+  # inputs differing only in inner annotations do not share an entry
+  typed = ast.parse("lambda x: f(x)", mode="eval").body
+  typed.args.args[0].stype = "e"
+  memo.simplify(ast.parse("lambda x: f(x)", mode="eval").body, env, "cfg", run)
+  memo.simplify(typed, env, "cfg", run)
+  assert len(calls) == 7
+  memo.invalidate()
+  assert memo.info().currsize == 0
+  memo.simplify(expr, env, "cfg", run)
+  assert len(calls) == 8
+  print("✅ SimplifyMemo sanity tests passed.")
@@ -2,9 +2,11 @@
 from ast import *
 from typing import List, Type
 from collections import ChainMap
-from .utils import is_literal
+from .utils import is_literal, CopyOnWriteTransformer, free_vars, lambda_params
+from .utils import rewrite_postorder, type_mask, types_mask
 import ast
 from p4s.core.constants import UNDEF
+from p4s.core.terms import term_id
 
 # Sentinel for shadowing the environment in SimplifyPass
 _SHADOW = object()
@@ -13,12 +15,102 @@ UNDEF_NAME = str(UNDEF)
 # ─────────────────────────────
 #  Base class
 # ─────────────────────────────
-class SimplifyPass(NodeTransformer):
-  """Base class: accepts an `env` mapping for transforms."""
+class SimplifyPass(CopyOnWriteTransformer):
+  """Base class: accepts an `env` mapping for transforms.
+
+  Passes are copy-on-write: they return new nodes for anything they
+  rewrite and never assign into the tree they are given, so subtrees can
+  be shared freely between PhiValues.
+
+  A pass is written as per-node-type *rules* rather than visitors:
+
+    • ``rewrite_<Type>(node)`` is called bottom-up, after the node's
+      children have been rewritten, and returns the replacement node;
+    • ``enter_<Type>(node)`` / ``exit_<Type>(node)`` bracket the walk of
+      a node's children (e.g. to push and pop a scope).  Returning
+      ``False`` from ``enter_`` skips the subtree for this pass.
+
+  ``TARGETS`` lists node types (operators included) of which a subtree
+  must contain at least one for the pass to rewrite anything in it; the
+  default is the types the pass has rules for.  Subtrees are skipped by
+  comparing against their cached node-type summary (``type_mask``).
+
+  Run on its own, a pass walks the tree once.  ``simplify()`` instead
+  fuses all rule-based passes into one traversal (see ``fused.py``).  A
+  pass that overrides ``visit`` or defines ``visit_<Type>`` methods is run
+  as a separate walk.
+  """
+  TARGETS: tuple | None = None
+
+  # per-class dispatch tables: node type name -> unbound method
+  _rules:  dict = {}
+  _enters: dict = {}
+  _exits:  dict = {}
+  fusable: bool = False
+  _target_mask: int = -1
+
+  def __init_subclass__(cls, **kwargs):
+    super().__init_subclass__(**kwargs)
+    def table(prefix):
+      return {name[len(prefix):]: getattr(cls, name)
+              for name in dir(cls) if name.startswith(prefix)}
+    cls._rules, cls._enters, cls._exits = table("rewrite_"), table("enter_"), table("exit_")
+    legacy = any(
+      name.startswith("visit_") and getattr(cls, name) is not getattr(ast.NodeVisitor, name, None)
+      for name in dir(cls)
+    )
+    cls.fusable = cls.visit is SimplifyPass.visit and not legacy
+    targets = cls.TARGETS
+    if targets is None and cls._rules:
+      targets = [getattr(ast, name) for name in cls._rules if hasattr(ast, name)]
+    cls._target_mask = -1 if targets is None else types_mask(targets)
+
   def __init__(self, env=None):
     super().__init__()
     self.env = {} if env is None else env
 
+  def rewrites_normal(self, node: AST) -> bool:
+    """
+    Could this pass still change *node*, a subtree already normal under
+    the pipeline, here?  Rules that only look at the subtree itself
+    cannot; passes that consult ``env`` per name override this.
+    """
+    return False
+
+  def visit(self, node: AST) -> AST:
+    return rewrite_postorder(node, None, self._start, self._open, self._close)
+
+  # walk callbacks; the per-node state is [done, result]: a node handled
+  # by a legacy visit_ method or skipped by enter_ is done before its
+  # children are walked
+  def _start(self, node: AST, ctx) -> list | None:
+    if not self.fusable:
+      legacy = getattr(self, "visit_" + type(node).__name__, None)
+      if legacy is not None:
+        return [True, legacy(node)]
+    if not self._target_mask & type_mask(node):
+      return None
+    return [False, node]
+
+  def _open(self, node: AST, state: list):
+    if state[0]:
+      return None
+    enter = self._enters.get(type(node).__name__)
+    if enter is not None and enter(self, node) is False:
+      state[0] = True
+      return None
+    return True
+
+  def _close(self, node: AST, state: list) -> tuple[AST, bool]:
+    done, result = state
+    if done:
+      return result, False
+    exit_ = self._exits.get(type(node).__name__)
+    if exit_ is not None:
+      exit_(self, node)
+    rule = self._rules.get(type(node).__name__)
+    return (node if rule is None else rule(self, node)), False
+
 
 # ─────────────────────────────
 #  Passes with Tests
@@ -30,42 +122,61 @@ class NameInliner(SimplifyPass):
   Inline identifiers whose run‑time value is a simple literal or has an .expr AST.
   """
   TEST_ENV = {"x":1}
+  TARGETS = (Name,)
   TESTS = [
     ("x", "1"),
     ("(1,2,3)[0]", "(1, 2, 3)[0]"),  # non‑literal index — no change
   ]
 
-  def visit_Lambda(self, node: Lambda) -> Lambda:
-    # collect all parameter names (positional, vararg, kwonly, kwarg)
-    names = {a.arg for a in node.args.args}
-    if node.args.vararg:   names.add(node.args.vararg.arg)
-    for a in node.args.kwonlyargs: names.add(a.arg)
-    if node.args.kwarg:    names.add(node.args.kwarg.arg)
+  def _inline_ast(self, name: str) -> AST | None:
+    """The AST that *name* would be replaced by here, if any."""
+    if name not in self.env:
+      return None
+    val = self.env[name]
+    if val is _SHADOW:
+      return None
+    if is_literal(val):
+      return parse(repr(val), mode="eval").body
+    # Inline any object with an .expr attribute that is an AST node
+    if hasattr(val, "expr") and isinstance(val.expr, ast.AST):
+      return val.expr
+    return None
+
+  def _has_inlinable(self, node: AST) -> bool:
+    return any(self._inline_ast(name) is not None for name in free_vars(node))
+
+  def rewrites_normal(self, node: AST) -> bool:
+    # normal forms are env-relative only through the names inlined here
+    return self._has_inlinable(node)
+
+  def enter_Lambda(self, node: Lambda) -> bool:
+    # a lambda with no inlinable free name is left alone without a walk
+    if not self._has_inlinable(node):
+      return False
+    # collect all parameter names (positional, posonly, vararg, kwonly, kwarg)
+    names = lambda_params(node.args)
 
     # push a new scope that shadows these names
     self.env = ChainMap({n: _SHADOW for n in names}, self.env)
-    try:
-      return self.generic_visit(node)
-    finally:
-      # pop that scope quickly: O(1)
-      self.env = self.env.parents
-
-  def visit_Name(self, node: Name):
-    if isinstance(node.ctx, Load) and node.id in self.env:
-      val = self.env[node.id]
-      if val is _SHADOW:
-        return node
-      if is_literal(val):
-        return parse(repr(val), mode="eval").body
-      # Inline any object with an .expr attribute that is an AST node
-      if hasattr(val, "expr") and isinstance(val.expr, ast.AST):
-        return val.expr
+    return True
+
+  def exit_Lambda(self, node: Lambda) -> None:
+    # pop that scope quickly: O(1)
+    self.env = self.env.parents
+
+  def rewrite_Name(self, node: Name):
+    if isinstance(node.ctx, Load):
+      inlined = self._inline_ast(node.id)
+      if inlined is not None:
+        return inlined
     return node
 
 class DictMergeFolder(SimplifyPass):
   """
   Merge literal dicts: {'a':1} | {'b':2} → {'a':1, 'b':2}
   """
+  # every rule needs a dict display somewhere below
+  TARGETS = (Dict,)
   TESTS = [
     ("{'a':1} | {'b':2}", "{'a': 1, 'b': 2}"),
     ("{'x':1} | {'x':2}", "{'x': 2}"),
@@ -78,8 +189,8 @@ class DictMergeFolder(SimplifyPass):
     keys = left.keys + right.keys
     values = left.values + right.values
 
-    merged: dict[str, tuple[AST, AST]] = {
-      ast.unparse(k): (k, v)
+    merged: dict[int, tuple[AST, AST]] = {
+      term_id(k): (k, v)
       for k, v in zip(keys, values)
     }
 
@@ -89,8 +200,7 @@ class DictMergeFolder(SimplifyPass):
     new_keys, new_values = zip(*merged.values())
     return Dict(keys=list(new_keys), values=list(new_values))
 
-  def visit_BinOp(self, node: BinOp):
-    self.generic_visit(node)
+  def rewrite_BinOp(self, node: BinOp):
     match(node):
       case BinOp(op=BitOr(), 
                  left=Dict(keys=keys1, values=values1), 
@@ -121,6 +231,7 @@ class DictLookupFolder(SimplifyPass):
     {i:1}[i]     → 1
     (d | {1:x})[1] → x
   """
+  TARGETS = (Dict,)
   TESTS = [
     ("{'a':1}['a']", "1"),
     ("{i:1}[i]", "1"),
@@ -129,9 +240,7 @@ class DictLookupFolder(SimplifyPass):
     ("(g | {2:x} | {2:x_1})[2]", "x_1"),
   ]
 
-  def visit_Subscript(self, node: Subscript):
-    self.generic_visit(node)
-
+  def rewrite_Subscript(self, node: Subscript):
     match node:
       # {'a':1}['a'] → 1 (constant key)
       case Subscript(value=Dict(keys=keys, values=values), slice=Constant(value=key)):
@@ -168,12 +277,12 @@ class IfExpConstFolder(SimplifyPass):
     a if True else b  → a
     a if False else b → b
   """
+  TARGETS = (IfExp,)
   TESTS = [
     ("a if True else b", "a"),
     ("a if False else b", "b"),
   ]
-  def visit_IfExp(self, node: IfExp):
-    self.generic_visit(node)
+  def rewrite_IfExp(self, node: IfExp):
     if isinstance(node.test, Constant):
       return node.body if node.test.value else node.orelse
     return node
@@ -191,6 +300,7 @@ class BoolIdentityPruner(SimplifyPass):
     False or x   → x
     True or x    → True
   """
+  TARGETS = (BoolOp,)
   TESTS = [
     ("x and True", "x"),
     ("x and False", "False"),
@@ -203,8 +313,7 @@ class BoolIdentityPruner(SimplifyPass):
     (f"x and {UNDEF_NAME}", UNDEF_NAME),
     (f"{UNDEF_NAME} and x", UNDEF_NAME),
   ]
-  def visit_BoolOp(self, node: BoolOp):
-    self.generic_visit(node)
+  def rewrite_BoolOp(self, node: BoolOp):
     match node:
       case BoolOp(op=And(), values=[Name(id=name), _]) if name == UNDEF_NAME:
         return Name(id=UNDEF_NAME, ctx=Load())
@@ -233,13 +342,13 @@ class BoolConstFolder(SimplifyPass):
   """
   Fold boolean ops when *all* operands are Constant.
   """
+  TARGETS = (BoolOp,)
   TESTS = [
     ("True and False", "False"),
     ("True or False", "True"),
     ("False and False", "False"),
   ]
-  def visit_BoolOp(self, node: BoolOp):
-    self.generic_visit(node)
+  def rewrite_BoolOp(self, node: BoolOp):
     if all(isinstance(v, Constant) for v in node.values):
       vals = [v.value for v in node.values]
       if isinstance(node.op, And):
@@ -268,3 +377,26 @@ PASS_PIPELINE.append(MacroExpander)
 from .guard_pass import GuardFolder, RemoveDuplicateGuards
 PASS_PIPELINE.append(GuardFolder)
 PASS_PIPELINE.append(RemoveDuplicateGuards)
+
+def pipeline_version() -> int:
+  """Small integer identifying the current PASS_PIPELINE configuration."""
+  return _PIPELINE_VERSIONS.setdefault(tuple(PASS_PIPELINE), len(_PIPELINE_VERSIONS) + 1)
+
+_PIPELINE_VERSIONS: dict[tuple, int] = {}
+
+# ─────────────────────────────
+#  Beta-reduction engines
+# ─────────────────────────────
+from .nameless_pass import NamelessBetaReducer
+
+BETA_ENGINES = {
+  "named":    BetaReducer,
+  "nameless": NamelessBetaReducer,
+}
+
+def select_beta_engine(name: str) -> None:
+  """Swap the β-reduction pass in PASS_PIPELINE ("named" or "nameless")."""
+  engine = BETA_ENGINES[name]
+  for i, cls in enumerate(PASS_PIPELINE):
+    if cls in BETA_ENGINES.values():
+      PASS_PIPELINE[i] = engine
@@ -1,9 +1,13 @@
 # phosphorus/simplify/utils.py
+import ast
 import inspect
 from collections import ChainMap
+from types import MappingProxyType
 
+_CO_OPTIMIZED = inspect.CO_OPTIMIZED
 
-def capture_env(skip: int = 0):
+
+def capture_env(skip: int = 0, names=None):
   """
   Walk the call stack, skipping `skip` frames, and build a ChainMap of:
     • all f_locals (from inner to outer),
@@ -11,6 +15,15 @@ def capture_env(skip: int = 0):
 
   `skip` determines how many additional frames beyond this function
   to omit (e.g., use skip=1 to start at the caller’s caller).
+
+  With `names` (e.g. the free variables of an expression) only those
+  names are captured from function frames: each is copied from the
+  innermost function frame that binds it into a small read-only mapping,
+  so nothing keeps the frames or their other locals alive, and function
+  frames that cannot bind any of the names are not materialised.
+  Module-level namespaces (a module, a notebook's user namespace, a class
+  body) are never copied: they stay in the chain, in stack order, as live
+  mappings, so a global bound or rebound later is still seen.
   """
   frame = inspect.currentframe()
   # advance past this frame plus any skipped frames
@@ -19,14 +32,47 @@ def capture_env(skip: int = 0):
       break
     frame = frame.f_back
 
-  maps = []
+  if names is None:
+    maps = []
+    last_globals = {}
+    while frame:
+      maps.append(frame.f_locals)
+      last_globals = frame.f_globals
+      frame = frame.f_back
+    return ChainMap(*maps, last_globals)
+
+  wanted = set(names)
+  maps = []                         # innermost first
+  live = set()                      # ids of the live namespaces in maps
+  snapshot = None                   # copies from the current run of function frames
   last_globals = {}
   while frame:
-    maps.append(frame.f_locals)
+    code = frame.f_code
     last_globals = frame.f_globals
+    if not code.co_flags & _CO_OPTIMIZED:
+      # module/class-level frame: keep its namespace itself
+      scope = frame.f_locals
+      if id(scope) not in live:
+        live.add(id(scope))
+        maps.append(scope)
+        snapshot = None
+      wanted.difference_update([n for n in wanted if n in scope])
+    elif wanted and (not wanted.isdisjoint(code.co_varnames)
+                     or not wanted.isdisjoint(code.co_cellvars)
+                     or not wanted.isdisjoint(code.co_freevars)):
+      scope = frame.f_locals
+      hits = [n for n in wanted if n in scope]
+      if hits:
+        if snapshot is None:
+          snapshot = {}
+          maps.append(MappingProxyType(snapshot))
+        for name in hits:
+          snapshot[name] = scope[name]
+        wanted.difference_update(hits)
     frame = frame.f_back
-
-  return ChainMap(*maps, last_globals)
+  if id(last_globals) not in live:
+    maps.append(last_globals)
+  return ChainMap(*maps)
 
 
 def is_literal(val) -> bool:
@@ -43,3 +89,325 @@ def is_literal(val) -> bool:
     return all(is_literal(item) for item in val)
   # you could extend to dict/frozenset here if desired
   return False
+
+
+# ---------------------------------------------------------------------------
+# Free-variable analysis
+# ---------------------------------------------------------------------------
+
+def lambda_params(args: ast.arguments) -> set[str]:
+  """All names bound by a lambda's parameter list (every parameter kind)."""
+  names = {a.arg for a in args.posonlyargs + args.args + args.kwonlyargs}
+  if args.vararg is not None:
+    names.add(args.vararg.arg)
+  if args.kwarg is not None:
+    names.add(args.kwarg.arg)
+  return names
+
+
+_NO_NAMES: frozenset[str] = frozenset()
+
+
+def _uncached_postorder(node: ast.AST, attr: str):
+  """Nodes of *node*'s subtree lacking annotation *attr*, children first.
+
+  Cached subtrees are not entered, so annotating a rewritten tree only
+  visits the nodes built since it was last annotated.
+  """
+  order = []
+  stack = [node]
+  while stack:
+    current = stack.pop()
+    order.append(current)
+    for child in ast.iter_child_nodes(current):
+      if attr not in child.__dict__:
+        stack.append(child)
+  order.reverse()
+  return order
+
+
+def free_vars(node: ast.AST) -> frozenset[str]:
+  """
+  Names loaded in *node* that no enclosing lambda inside *node* binds.
+
+  The result is cached on the node.  Engine ASTs are copy-on-write, so a
+  node's free variables never change; rewritten nodes are fresh objects
+  (``copy_node`` drops the cache) and get theirs from their children's
+  cached sets, so keeping the annotation current costs O(children).
+  """
+  cached = node.__dict__.get("_free_vars")
+  if cached is not None:
+    return cached
+  for current in _uncached_postorder(node, "_free_vars"):
+    if isinstance(current, ast.Name):
+      out = frozenset((current.id,)) if isinstance(current.ctx, ast.Load) else _NO_NAMES
+    elif isinstance(current, ast.Lambda):
+      out = current.body._free_vars - lambda_params(current.args)
+    else:
+      out = _NO_NAMES
+      for child in ast.iter_child_nodes(current):
+        names = child._free_vars
+        if names and names is not out:
+          out = out | names if out else names
+    current._free_vars = out
+  return node._free_vars
+
+
+# ---------------------------------------------------------------------------
+# Node-type summaries
+# ---------------------------------------------------------------------------
+
+_TYPE_BITS: dict[type, int] = {}
+
+
+def type_bit(cls: type) -> int:
+  """The bit standing for AST node type *cls* in subtree summaries."""
+  bit = _TYPE_BITS.get(cls)
+  if bit is None:
+    bit = _TYPE_BITS[cls] = 1 << len(_TYPE_BITS)
+  return bit
+
+
+def types_mask(types) -> int:
+  """Bitmask with the bits of every type in *types*."""
+  mask = 0
+  for cls in types:
+    mask |= type_bit(cls)
+  return mask
+
+
+def type_mask(node: ast.AST) -> int:
+  """
+  Bitmask of the node types occurring in *node*'s subtree, operators
+  included (so ``ast.Mod`` marks a subtree containing a ``%``).
+
+  Cached on the node; like ``free_vars`` it stays valid under the
+  copy-on-write discipline and costs O(children) for a rewritten node.
+  """
+  cached = node.__dict__.get("_type_mask")
+  if cached is not None:
+    return cached
+  for current in _uncached_postorder(node, "_type_mask"):
+    mask = type_bit(type(current))
+    for child in ast.iter_child_nodes(current):
+      mask |= child._type_mask
+    current._type_mask = mask
+  return node._type_mask
+
+
+# ---------------------------------------------------------------------------
+# Copy-on-write AST rewriting
+# ---------------------------------------------------------------------------
+
+_LOCATION_ATTRS = ("lineno", "col_offset", "end_lineno", "end_col_offset")
+_CARRIED_ANNOTATIONS = ("stype", "guard")
+
+
+def copy_node(node: ast.AST, **changes) -> ast.AST:
+  """
+  Return a shallow copy of *node* with *changes* applied to its fields.
+
+  Children are shared, not copied.  Source locations and the engine's
+  ``stype`` / ``guard`` annotations carry over; any other cached
+  annotation is left behind because it described the old node.
+  """
+  new = type(node).__new__(type(node))
+  for field, value in ast.iter_fields(node):
+    setattr(new, field, changes.get(field, value))
+  for attr in _LOCATION_ATTRS + _CARRIED_ANNOTATIONS:
+    if attr in node.__dict__:
+      setattr(new, attr, node.__dict__[attr])
+  return new
+
+
+class CopyOnWriteTransformer(ast.NodeTransformer):
+  """
+  ``NodeTransformer`` that never mutates the tree it is given.
+
+  ``generic_visit`` returns the *same* node when no child changed and a
+  fresh shallow copy otherwise, so rewriting copies only the path from the
+  root to each rewritten subterm and unchanged subtrees stay shared with
+  the input.  Visitors must therefore use the return value of
+  ``generic_visit`` and build new nodes instead of assigning to fields.
+  """
+
+  def generic_visit(self, node: ast.AST) -> ast.AST:
+    changes = {}
+    for field, old_value in ast.iter_fields(node):
+      if isinstance(old_value, list):
+        new_values = []
+        changed = False
+        for value in old_value:
+          if isinstance(value, ast.AST):
+            new = self.visit(value)
+            if new is not value:
+              changed = True
+            if new is None:
+              continue
+            if not isinstance(new, ast.AST):
+              new_values.extend(new)
+              continue
+          else:
+            new = value
+          new_values.append(new)
+        if changed:
+          changes[field] = new_values
+      elif isinstance(old_value, ast.AST):
+        new = self.visit(old_value)
+        if new is not old_value:
+          changes[field] = new
+    if not changes:
+      return node
+    return copy_node(node, **changes)
+
+
+# ---------------------------------------------------------------------------
+# Iterative rewrite driver
+# ---------------------------------------------------------------------------
+
+# rewrite_postorder result slot that has not been filled yet
+_PENDING = object()
+
+
+class _Frame:
+  __slots__ = ("node", "state", "ctx", "slots", "results")
+
+  def __init__(self, node, state, ctx):
+    self.node = node
+    self.state = state
+    self.ctx = ctx
+    self.slots = _child_slots(node) if ctx is not None else ()
+    self.results = []
+
+
+def _child_slots(node: ast.AST) -> list[tuple[str, int | None, ast.AST]]:
+  """``(field, list index or None, child)`` for every AST child of *node*."""
+  slots = []
+  for field in node._fields:
+    value = getattr(node, field, None)
+    if isinstance(value, list):
+      slots.extend((field, i, v) for i, v in enumerate(value) if isinstance(v, ast.AST))
+    elif isinstance(value, ast.AST):
+      slots.append((field, None, value))
+  return slots
+
+
+def _rebuild(node: ast.AST, slots, results) -> ast.AST:
+  """Copy *node* with rewritten children, or return it if none changed.
+
+  In list fields a ``None`` result deletes the child and a non-AST
+  iterable is spliced in, as with ``ast.NodeTransformer``.
+  """
+  changes: dict[str, dict] = {}
+  for slot, new in zip(slots, results):
+    if new is not slot[2]:
+      changes.setdefault(slot[0], {})[slot[1]] = new
+  if not changes:
+    return node
+  fields = {}
+  for field, replaced in changes.items():
+    if None in replaced:
+      fields[field] = replaced[None]
+      continue
+    new_values = []
+    for i, value in enumerate(getattr(node, field)):
+      if i not in replaced:
+        new_values.append(value)
+        continue
+      new = replaced[i]
+      if isinstance(new, ast.AST):
+        new_values.append(new)
+      elif new is not None:
+        new_values.extend(new)
+    fields[field] = new_values
+  return copy_node(node, **fields)
+
+
+def rewrite_postorder(root: ast.AST, ctx, start, open_, close) -> ast.AST:
+  """
+  Copy-on-write bottom-up rewrite of *root* using an explicit stack.
+
+  The walk is driven by three callbacks, so arbitrarily deep terms are
+  rewritten without recursion:
+
+    • ``start(node, ctx)`` decides whether to handle *node* at all: it
+      returns a per-node *state*, or ``None`` to keep the node unchanged;
+    • ``open_(node, state)`` runs before the children and returns the
+      *ctx* to visit them with, or ``None`` to leave them alone;
+    • ``close(node, state)`` gets the node rebuilt from its rewritten
+      children and returns ``(replacement, again)``.  With ``again`` true
+      the replacement is opened and closed again with the same state
+      (used to normalise a rewritten node in place).
+
+  Unchanged subtrees are returned as the same objects.
+  """
+  frames: list[_Frame] = []
+
+  def begin(node, ctx, state=None):
+    if state is None:
+      state = start(node, ctx)
+      if state is None:
+        return node
+    frames.append(_Frame(node, state, open_(node, state)))
+    return _PENDING
+
+  result = begin(root, ctx)
+  while frames:
+    frame = frames[-1]
+    if result is not _PENDING:
+      frame.results.append(result)
+    if len(frame.results) < len(frame.slots):
+      result = begin(frame.slots[len(frame.results)][2], frame.ctx)
+      continue
+    frames.pop()
+    node = _rebuild(frame.node, frame.slots, frame.results)
+    node, again = close(node, frame.state)
+    result = begin(node, None, frame.state) if again else node
+  return result
+
+
+# ---------------------------------------------------------------------------
+# rudimentary tests
+# ---------------------------------------------------------------------------
+
+if __name__ == "__main__":
+  class _Rename(CopyOnWriteTransformer):
+    def visit_Name(self, node):
+      return copy_node(node, id="y") if node.id == "x" else node
+
+  # copy-on-write: the input is untouched and unchanged subtrees are shared
+  tree = ast.parse("f(x, g(z)) + h(lambda x: x + z)", mode="eval").body
+  tree.stype = "T"
+  before = ast.dump(tree)
+  out = _Rename().visit(tree)
+  assert ast.dump(tree) == before and out is not tree and out.stype == "T"
+  assert ast.unparse(out.left) == "f(y, g(z))" and out.left.args[1] is tree.left.args[1]
+  assert _Rename().visit(tree.left.args[1]) is tree.left.args[1]
+
+  # cached free names and node-type summaries, valid for the copies too
+  assert free_vars(tree) == {"f", "x", "g", "z", "h"}
+  assert free_vars(tree.right) == {"h", "z"} and free_vars(out.left) == {"f", "y", "g", "z"}
+  assert type_mask(tree) & type_bit(ast.Lambda) and not type_mask(tree.left) & type_bit(ast.Lambda)
+
+  # the iterative walkers take terms far deeper than the recursion limit
+  deep = ast.Name(id="x", ctx=ast.Load())
+  for _ in range(50_000):
+    deep = ast.UnaryOp(op=ast.Not(), operand=deep)
+  assert free_vars(deep) == {"x"}
+  def start(node, ctx):
+    return [] if isinstance(node, (ast.UnaryOp, ast.Name)) else None
+  def close(node, state):
+    return (copy_node(node, id="y"), False) if isinstance(node, ast.Name) else (node, False)
+  renamed = rewrite_postorder(deep, True, start, lambda node, state: True, close)
+  assert free_vars(renamed) == {"y"} and free_vars(deep) == {"x"}
+
+  # env capture: function locals by value, module namespaces live
+  def make():
+    k = 1
+    return capture_env(names={"k", "later"})
+  namespace = {"make": make, "capture_env": capture_env}
+  exec("env = make()", namespace)
+  namespace["later"] = 2
+  env = namespace["env"]
+  assert env["k"] == 1 and env["later"] == 2
+  print("✅ simplify.utils sanity tests passed.")